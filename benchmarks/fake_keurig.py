@@ -0,0 +1,236 @@
+"""A local stand-in for pykeurig and the Keurig cloud.
+
+install() registers fake pykeurig modules so the integration talks to an
+in-process FakeCloud instead of the real service. The cloud has configurable
+latency, failure rate and push rate, and counts every call made against it.
+Pushes are delivered from a thread like pykeurig's push client. Brew commands
+push BREW_IN_PROGRESS and, brew_time later, BREW_READY, so the integration's
+command queue sees the brewer become ready again.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from dataclasses import dataclass, field
+from functools import partial
+import random
+import sys
+import threading
+import time
+import types
+from typing import Any
+
+STATUS_ON = "ON"
+STATUS_OFF = "OFF"
+STATUS_BREWING = "BREWING"
+
+BREWER_STATUSES = ("BREW_READY", "BREW_IN_PROGRESS", "BREW_SUCCESSFUL")
+
+# A 1x1 transparent PNG, padded so image transfers are a realistic size
+_PNG = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360000002000001e221bc330000000049454e44ae426082"
+)
+
+
+class UnauthorizedException(Exception):
+    pass
+
+
+@dataclass
+class FakeCloud:
+    """Behaviour of the simulated Keurig cloud."""
+
+    brewers: int = 1
+    latency: float = 0.05
+    jitter: float = 0.02
+    failure_rate: float = 0.0
+    push_rate: float = 0.0
+    # Random status pushes are only sent while this is set, so they don't hold
+    # up queued brews
+    random_pushes: bool = False
+    brew_time: float = 0.0
+    image_size: int = 256 * 1024
+    calls: Counter = field(default_factory=Counter)
+    devices: list[FakeKeurigDevice] = field(default_factory=list)
+
+    def __post_init__(self):
+        self.devices = [
+            FakeKeurigDevice(self, f"k{index}") for index in range(self.brewers)
+        ]
+        self.image = _PNG + bytes(max(0, self.image_size - len(_PNG)))
+
+    async def request(self, name: str) -> None:
+        """Simulate one round-trip to the cloud."""
+        self.calls[name] += 1
+        await asyncio.sleep(max(0.0, random.gauss(self.latency, self.jitter)))
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise ConnectionError(f"Simulated failure of {name}")
+
+
+class FakeKeurigDevice:
+    def __init__(self, cloud: FakeCloud, device_id: str):
+        self._cloud = cloud
+        self._callbacks: list = []
+        self.id = device_id
+        self.name = device_id
+        self.model = "K-Supreme Plus SMART"
+        self.sw_version = "1.0"
+        self.appliance_status = STATUS_ON
+        self.brewer_status = "BREW_READY"
+        self.errors: list[str] = []
+        self.pod_status = "POD"
+        self.pod_brand = "Green Mountain"
+        self.pod_brand_id = "1"
+        self.pod_variety = "Breakfast Blend"
+        self.pod_variety_id = "1"
+        self.pod_roast_type = "LIGHT"
+        self.pod_is_tea = False
+        self.pod_is_iced = False
+        self.pod_is_flavored = False
+        self.pod_is_powdered = False
+        # perf_counter() of the last simulated push, read by the benchmark
+        self.last_push: float | None = None
+
+    def register_callback(self, callback):
+        self._callbacks.append(callback)
+        return lambda: self._callbacks.remove(callback)
+
+    def push(self, **changes: Any) -> None:
+        """Apply changes as if they arrived over the push channel."""
+        for key, value in changes.items():
+            setattr(self, key, value)
+        self.last_push = time.perf_counter()
+        for callback in list(self._callbacks):
+            callback(changes)
+
+    async def async_update(self):
+        await self._cloud.request("async_update")
+
+    async def _command(self, name: str, *args) -> bool:
+        await self._cloud.request(name)
+        return True
+
+    async def power_on(self):
+        return await self._command("power_on")
+
+    async def power_off(self):
+        return await self._command("power_off")
+
+    async def _brew(self, name: str, *args) -> bool:
+        result = await self._command(name, *args)
+        self.push(brewer_status="BREW_IN_PROGRESS")
+        asyncio.get_running_loop().call_later(
+            self._cloud.brew_time, partial(self.push, brewer_status="BREW_READY")
+        )
+        return result
+
+    async def hot_water(self, size, temp):
+        return await self._brew("hot_water", size, temp)
+
+    async def brew_hot(self, size, temp, intensity):
+        return await self._brew("brew_hot", size, temp, intensity)
+
+    async def brew_iced(self):
+        return await self._brew("brew_iced")
+
+    async def brew_recommendation(self, size):
+        return await self._brew("brew_recommendation", size)
+
+    async def brew_favorite(self, favorite_id):
+        return await self._brew("brew_favorite", favorite_id)
+
+    async def cancel_brew(self):
+        return await self._command("cancel_brew")
+
+    async def add_favorite(self, name, size, temp, intensity):
+        return await self._command("add_favorite", name, size, temp, intensity)
+
+    async def update_favorite(self, favorite_id, name, size, temp, intensity):
+        return await self._command(
+            "update_favorite", favorite_id, name, size, temp, intensity
+        )
+
+    async def delete_favorite(self, favorite_id):
+        return await self._command("delete_favorite", favorite_id)
+
+
+class FakeKeurigApi:
+    cloud: FakeCloud
+
+    def __init__(self):
+        self._push_thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    async def login(self, email, password):
+        await self.cloud.request("login")
+        return True
+
+    async def async_get_devices(self):
+        await self.cloud.request("async_get_devices")
+        return self.cloud.devices
+
+    async def async_get_brand_image(self, brand_id):
+        await self.cloud.request("async_get_brand_image")
+        return self.cloud.image
+
+    async def async_get_variety_image(self, variety_id):
+        await self.cloud.request("async_get_variety_image")
+        return self.cloud.image
+
+    def connect(self):
+        self.cloud.calls["connect"] += 1
+        if self.cloud.push_rate and self._push_thread is None:
+            self._stop.clear()
+            self._push_thread = threading.Thread(
+                target=self._push_loop, name="fake keurig push", daemon=True
+            )
+            self._push_thread.start()
+
+    def disconnect(self):
+        self._stop.set()
+        self._push_thread = None
+
+    def _push_loop(self):
+        # Like pykeurig, pushes are delivered on a thread of their own
+        interval = 1 / self.cloud.push_rate
+        while not self._stop.wait(interval):
+            self._push_random()
+
+    def _push_random(self):
+        if not self.cloud.random_pushes:
+            return
+        device = random.choice(self.cloud.devices)
+        status = BREWER_STATUSES[
+            (BREWER_STATUSES.index(device.brewer_status) + 1) % len(BREWER_STATUSES)
+        ]
+        device.push(brewer_status=status)
+
+
+def install(cloud: FakeCloud) -> None:
+    """Replace pykeurig with fakes backed by cloud."""
+    FakeKeurigApi.cloud = cloud
+
+    package = types.ModuleType("pykeurig")
+    package.__path__ = []
+    keurigapi = types.ModuleType("pykeurig.keurigapi")
+    keurigapi.KeurigApi = FakeKeurigApi
+    keurigapi.UnauthorizedException = UnauthorizedException
+    keurigdevice = types.ModuleType("pykeurig.keurigdevice")
+    keurigdevice.KeurigDevice = FakeKeurigDevice
+    const = types.ModuleType("pykeurig.const")
+    const.STATUS_ON = STATUS_ON
+    const.STATUS_OFF = STATUS_OFF
+    const.STATUS_BREWING = STATUS_BREWING
+
+    package.keurigapi = keurigapi
+    package.keurigdevice = keurigdevice
+    package.const = const
+    sys.modules.update(
+        {
+            "pykeurig": package,
+            "pykeurig.keurigapi": keurigapi,
+            "pykeurig.keurigdevice": keurigdevice,
+            "pykeurig.const": const,
+        }
+    )
@@ -0,0 +1,241 @@
+"""Benchmark the Keurig integration against a simulated Keurig cloud.
+
+Measures cold-start setup time, service latency, image proxy throughput and
+push callback to state write latency for each requested brewer count, and
+writes the results as JSON so runs can be compared between versions.
+
+    python benchmarks/run.py --brewers 1 10 50 --output results.json
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_keurig import FakeCloud, install  # noqa: E402
+
+DOMAIN = "keurig"
+
+
+def summarize(samples: list[float]) -> dict:
+    """Return latency statistics in milliseconds."""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def percentile(fraction):
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000
+
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+async def bench_services(hass, entity_ids, iterations) -> dict:
+    from homeassistant.exceptions import HomeAssistantError
+
+    results = {}
+    for service, data in (
+        ("cancel_brew", {}),
+        ("brew_hot", {"size": 8, "temperature": 194, "intensity": 4435}),
+    ):
+        samples, errors = [], 0
+        for _ in range(iterations):
+            start = time.perf_counter()
+            try:
+                await hass.services.async_call(
+                    DOMAIN,
+                    service,
+                    {"entity_id": entity_ids, **data},
+                    blocking=True,
+                )
+            except HomeAssistantError:
+                errors += 1
+            samples.append(time.perf_counter() - start)
+        results[service] = {**summarize(samples), "errors": errors}
+    return results
+
+
+async def bench_image_proxy(view, entity_ids, requests, concurrency) -> dict:
+    from aiohttp.test_utils import make_mocked_request
+
+    async def fetch(entity_id):
+        request = make_mocked_request("GET", f"/api/keurig_variety_proxy/{entity_id}")
+        start = time.perf_counter()
+        response = await view.get(request, entity_id)
+        return time.perf_counter() - start, response.status
+
+    # The first request for every pod fills the cache
+    cold = [await fetch(entity_id) for entity_id in entity_ids]
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(index):
+        async with semaphore:
+            return await fetch(entity_ids[index % len(entity_ids)])
+
+    start = time.perf_counter()
+    warm = await asyncio.gather(*(bounded(index) for index in range(requests)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "cold": summarize([latency for latency, _ in cold]),
+        "warm": summarize([latency for latency, _ in warm]),
+        "requests_per_second": requests / elapsed if elapsed else None,
+        "non_200": sum(1 for _, status in cold + warm if status != 200),
+    }
+
+
+async def bench_push(hass, cloud, entity_to_device, duration) -> dict:
+    from homeassistant.const import EVENT_STATE_CHANGED
+
+    samples = []
+    cloud.random_pushes = True
+
+    def on_state_changed(event):
+        device = entity_to_device.get(event.data["entity_id"])
+        if device is not None and device.last_push is not None:
+            samples.append(time.perf_counter() - device.last_push)
+
+    unsub = hass.bus.async_listen(EVENT_STATE_CHANGED, on_state_changed)
+    await asyncio.sleep(duration)
+    unsub()
+    cloud.random_pushes = False
+    return {
+        **summarize(samples),
+        "pushes_per_second": cloud.push_rate,
+        "writes_per_second": len(samples) / duration,
+    }
+
+
+async def run_scenario(brewers: int, args) -> dict:
+    from homeassistant import loader
+    from homeassistant.helpers import entity_registry
+    from pytest_homeassistant_custom_component.common import (
+        MockConfigEntry,
+        async_test_home_assistant,
+    )
+
+    cloud = FakeCloud(
+        brewers=brewers,
+        latency=args.latency,
+        jitter=args.jitter,
+        failure_rate=args.failure_rate,
+        push_rate=args.push_rate,
+    )
+    for index, device in enumerate(cloud.devices):
+        device.pod_variety_id = str(index % 10)
+    install(cloud)
+
+    views = []
+    async with async_test_home_assistant() as hass:
+        hass.config.config_dir = tempfile.mkdtemp(prefix="keurig-bench-")
+        hass.data.pop(loader.DATA_CUSTOM_COMPONENTS, None)
+        # Views are called directly, so skip starting an HTTP server
+        hass.config.components.add("http")
+        hass.http = SimpleNamespace(register_view=views.append)
+
+        entry = MockConfigEntry(
+            domain=DOMAIN,
+            data={
+                "username": "bench@example.com",
+                "password": "bench",
+                "brewers": [device.id for device in cloud.devices],
+            },
+        )
+        entry.add_to_hass(hass)
+
+        start = time.perf_counter()
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        cold_start = time.perf_counter() - start
+        setup_calls = dict(cloud.calls)
+
+        devices = {device.id: device for device in cloud.devices}
+        entities = entity_registry.async_entries_for_config_entry(
+            entity_registry.async_get(hass), entry.entry_id
+        )
+        switches = [
+            entity.entity_id for entity in entities if entity.domain == "switch"
+        ]
+        pod_sensors = [
+            entity.entity_id
+            for entity in entities
+            if entity.unique_id.endswith("_pod_status")
+        ]
+        entity_to_device = {
+            entity.entity_id: devices[entity.unique_id.rsplit("_", 2)[0]]
+            for entity in entities
+            if entity.unique_id.endswith("_brewer_status")
+        }
+        variety_view = next(view for view in views if view.name == "api:keurig:variety")
+
+        result = {
+            "brewers": brewers,
+            "cold_start_s": cold_start,
+            "setup_cloud_calls": setup_calls,
+            "services": await bench_services(hass, switches, args.service_iterations),
+            "image_proxy": await bench_image_proxy(
+                variety_view, pod_sensors, args.image_requests, args.image_concurrency
+            ),
+            "push": await bench_push(hass, cloud, entity_to_device, args.push_duration),
+            "cloud_calls": dict(cloud.calls),
+        }
+
+        await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+        await hass.async_stop(force=True)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--brewers", type=int, nargs="+", default=[1, 5, 25])
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds")
+    parser.add_argument("--jitter", type=float, default=0.02, help="seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--push-rate", type=float, default=20.0, help="per second")
+    parser.add_argument("--push-duration", type=float, default=5.0, help="seconds")
+    parser.add_argument("--service-iterations", type=int, default=20)
+    parser.add_argument("--image-requests", type=int, default=500)
+    parser.add_argument("--image-concurrency", type=int, default=20)
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    results = {
+        "meta": {
+            "python": platform.python_version(),
+            "timestamp": time.time(),
+            "args": vars(args),
+        },
+        "results": [],
+    }
+    for brewers in args.brewers:
+        results["results"].append(asyncio.run(run_scenario(brewers, args)))
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
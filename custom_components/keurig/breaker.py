@@ -0,0 +1,93 @@
+"""Circuit breaker for Keurig cloud calls."""
+from __future__ import annotations
+
+from collections.abc import Callable
+import time
+from typing import Any
+
+from homeassistant.core import CALLBACK_TYPE, callback
+from homeassistant.exceptions import HomeAssistantError
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+BREAKER_STATES = [STATE_CLOSED, STATE_OPEN, STATE_HALF_OPEN]
+
+
+class CircuitOpenError(HomeAssistantError):
+    """The Keurig cloud is known to be down, so the call wasn't attempted."""
+
+
+class CircuitBreaker:
+    """Fail calls fast while the cloud keeps failing.
+
+    After failure_threshold consecutive failures the breaker opens and rejects
+    every call for reset_timeout seconds. It then lets a single probe through,
+    closing again if that succeeds and reopening if it fails.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+        self._listeners: list[Callable[[], None]] = []
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return STATE_CLOSED
+        if self._probing or time.monotonic() - self._opened_at >= self._reset_timeout:
+            return STATE_HALF_OPEN
+        return STATE_OPEN
+
+    @callback
+    def async_add_listener(self, listener: Callable[[], None]) -> CALLBACK_TYPE:
+        """Call listener whenever the breaker opens or closes."""
+        self._listeners.append(listener)
+        return lambda: self._listeners.remove(listener)
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError unless a call may be attempted now."""
+        state = self.state
+        if state == STATE_CLOSED:
+            return
+        if state == STATE_HALF_OPEN and not self._probing:
+            self._probing = True
+            return
+        raise CircuitOpenError("The Keurig cloud is unavailable, try again later")
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._probing = False
+        if self._opened_at is not None:
+            self._opened_at = None
+            self._notify()
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._probing or (
+            self._opened_at is None and self._failures >= self._failure_threshold
+        ):
+            if self._opened_at is None:
+                self.trips += 1
+            self._probing = False
+            self._opened_at = time.monotonic()
+            self._notify()
+
+    def record_abort(self) -> None:
+        """Forget a call that was cancelled before it had an outcome."""
+        self._probing = False
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "trips": self.trips,
+        }
+
+    def _notify(self) -> None:
+        for listener in list(self._listeners):
+            listener()
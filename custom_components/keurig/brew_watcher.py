@@ -0,0 +1,123 @@
+"""Follow a brew to completion for the Keurig Connect integration."""
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import callback
+
+from .const import (
+    BREWER_ERROR_POD_NOT_REMOVED,
+    BREWER_STATUS_BREWING,
+    BREWER_STATUS_CANCELING,
+    BREWER_STATUS_LOCKED,
+    BREWER_STATUS_READY,
+    BREWER_STATUS_SUCCESSFUL,
+)
+
+if TYPE_CHECKING:
+    from pykeurig.keurigdevice import KeurigDevice
+
+    from .coordinator import KeurigCoordinator
+
+OUTCOME_SENT = "sent"
+OUTCOME_QUEUED = "queued"
+OUTCOME_SUCCESS = "success"
+OUTCOME_CANCELED = "canceled"
+OUTCOME_ERROR = "error"
+OUTCOME_TIMEOUT = "timeout"
+
+
+class BrewWatcher:
+    """Follow one brew through the brewer's status updates.
+
+    Create it right before sending the command so no update can be missed, call
+    mark_sent once the cloud accepted it and then await async_wait.
+
+    A brew usually ends in BREW_LOCKED with only PM_NOT_CYCLED, until the pod
+    is removed, and BREW_SUCCESSFUL only shows up occasionally. Hot water needs
+    no pod and goes back to BREW_READY. All three count as success once the
+    brew has started, any other error as a failure.
+    """
+
+    def __init__(self, coordinator: KeurigCoordinator, device: KeurigDevice):
+        self._device = device
+        self._finished: asyncio.Future[str] = coordinator.hass.loop.create_future()
+        self._sent_at = time.monotonic()
+        self._accepted = False
+        self._started_at: float | None = None
+        self._ended_at: float | None = None
+        self._unsubs = [
+            coordinator.session.async_add_push_listener(
+                device.id, self._async_on_update
+            ),
+            coordinator.async_add_listener(self._async_on_update),
+        ]
+
+    def mark_sent(self) -> None:
+        self._accepted = True
+        # The brewer may have moved on before the cloud answered
+        self._async_on_update()
+
+    async def async_wait(self, timeout: float) -> dict[str, Any]:
+        """Return the brew's outcome and timings once it has finished."""
+        try:
+            outcome = await asyncio.wait_for(asyncio.shield(self._finished), timeout)
+        except asyncio.TimeoutError:
+            outcome = OUTCOME_TIMEOUT
+        finally:
+            self.async_cancel()
+        return self.as_dict(outcome)
+
+    @callback
+    def async_cancel(self) -> None:
+        for unsub in self._unsubs:
+            unsub()
+        self._unsubs.clear()
+
+    def as_dict(self, outcome: str = OUTCOME_SENT) -> dict[str, Any]:
+        return {
+            "outcome": outcome,
+            "time_to_start": _elapsed(self._sent_at, self._started_at),
+            "duration": _elapsed(self._started_at, self._ended_at),
+            "errors": (
+                list(self._device.errors or ()) if outcome == OUTCOME_ERROR else []
+            ),
+        }
+
+    @callback
+    def _async_on_update(self) -> None:
+        if self._finished.done():
+            return
+        status = self._device.brewer_status
+        if status == BREWER_STATUS_BREWING:
+            # Also before the cloud answered, the brew may start that quickly
+            if self._started_at is None:
+                self._started_at = time.monotonic()
+            return
+        if not self._accepted:
+            return
+        errors = set(self._device.errors or ()) - {BREWER_ERROR_POD_NOT_REMOVED}
+        if status == BREWER_STATUS_CANCELING:
+            self._finish(OUTCOME_CANCELED)
+        elif errors:
+            self._finish(OUTCOME_ERROR)
+        elif status == BREWER_STATUS_SUCCESSFUL or (
+            self._started_at is not None
+            and status in (BREWER_STATUS_LOCKED, BREWER_STATUS_READY)
+        ):
+            self._finish(OUTCOME_SUCCESS)
+
+    def _finish(self, outcome: str) -> None:
+        self._ended_at = time.monotonic()
+        if self._started_at is None and outcome == OUTCOME_SUCCESS:
+            # Too quick for a pushed BREW_IN_PROGRESS
+            self._started_at = self._ended_at
+        self._finished.set_result(outcome)
+
+
+def _elapsed(start: float | None, end: float | None) -> float | None:
+    if start is None or end is None:
+        return None
+    return round(end - start, 1)
@@ -0,0 +1,194 @@
+"""Per-brewer brew command queue for the Keurig Connect integration."""
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import partial
+import logging
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers.event import async_call_later
+
+from .const import (
+    BREWER_STATUS_READY,
+    COMMAND_QUEUE_EXPIRY,
+    COMMAND_QUEUE_MAX_DEPTH,
+    COMMAND_START_TIMEOUT,
+)
+
+if TYPE_CHECKING:
+    from pykeurig.keurigdevice import KeurigDevice
+
+    from .coordinator import KeurigCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class _QueuedCommand:
+    send: Callable[[], Awaitable[Any]]
+    future: asyncio.Future
+    unsub_expiry: CALLBACK_TYPE | None = field(default=None, repr=False)
+
+    def cancel_expiry(self) -> None:
+        if self.unsub_expiry is not None:
+            self.unsub_expiry()
+            self.unsub_expiry = None
+
+
+class BrewerCommandQueue:
+    """Send brew commands to one brewer one at a time, each once it's ready.
+
+    Commands wait while the brewer is brewing or locked and are sent as soon as
+    a push or poll reports BREW_READY. After a command is sent the next one
+    waits for the brewer to leave the ready state, or for COMMAND_START_TIMEOUT
+    if it never does. Commands still waiting after COMMAND_QUEUE_EXPIRY fail.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, coordinator: KeurigCoordinator, device: KeurigDevice
+    ):
+        self._hass = hass
+        self._device = device
+        self._queue: deque[_QueuedCommand] = deque()
+        self._listeners: list[Callable[[], None]] = []
+        self._sending = False
+        self._unsub_start: CALLBACK_TYPE | None = None
+        self._unsubs = [
+            coordinator.session.async_add_push_listener(device.id, self._async_check),
+            coordinator.async_add_listener(self._async_check),
+        ]
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    @callback
+    def async_add_listener(self, listener: Callable[[], None]) -> CALLBACK_TYPE:
+        """Call listener whenever the queue depth changes."""
+        self._listeners.append(listener)
+        return partial(self._listeners.remove, listener)
+
+    async def async_submit(
+        self, send: Callable[[], Awaitable[Any]], wait: bool = False
+    ) -> bool:
+        """Queue send, returning True once the brewer has run it.
+
+        A command the brewer isn't ready for stays queued and False is returned
+        straight away, unless wait is set, in which case this waits for it to be
+        sent. Failures of commands nobody waits for are logged.
+        """
+        if len(self._queue) >= COMMAND_QUEUE_MAX_DEPTH:
+            raise HomeAssistantError(
+                f"{self._device.name} already has {len(self._queue)} queued commands"
+            )
+        command = _QueuedCommand(send, self._hass.loop.create_future())
+        command.unsub_expiry = async_call_later(
+            self._hass, COMMAND_QUEUE_EXPIRY, partial(self._async_expire, command)
+        )
+        self._queue.append(command)
+        self._notify()
+        self._async_check()
+        if not wait and command in self._queue:
+            command.future.add_done_callback(self._log_failure)
+            return False
+        try:
+            await command.future
+        except asyncio.CancelledError:
+            # The caller gave up, don't brew for nobody
+            self._async_discard(command)
+            raise
+        return True
+
+    @callback
+    def async_shutdown(self) -> None:
+        for unsub in self._unsubs:
+            unsub()
+        self._unsubs.clear()
+        self._async_cancel_start_timer()
+        while self._queue:
+            command = self._queue.popleft()
+            command.cancel_expiry()
+            if not command.future.done():
+                command.future.set_exception(
+                    HomeAssistantError("The brewer was unloaded")
+                )
+        self._notify()
+
+    @callback
+    def _async_check(self) -> None:
+        """Send the next command if the brewer is ready for it."""
+        ready = self._device.brewer_status == BREWER_STATUS_READY
+        if not ready:
+            # The previous command has started, the next one waits for ready
+            self._async_cancel_start_timer()
+        if not ready or self._sending or self._unsub_start or not self._queue:
+            return
+        command = self._queue.popleft()
+        command.cancel_expiry()
+        self._notify()
+        self._sending = True
+        self._hass.async_create_task(self._async_send(command))
+
+    async def _async_send(self, command: _QueuedCommand) -> None:
+        try:
+            result = await command.send()
+        except Exception as err:  # pylint: disable=broad-except
+            if not command.future.done():
+                command.future.set_exception(err)
+        else:
+            if not command.future.done():
+                command.future.set_result(result)
+            self._unsub_start = async_call_later(
+                self._hass, COMMAND_START_TIMEOUT, self._async_start_timeout
+            )
+        finally:
+            self._sending = False
+        self._async_check()
+
+    @callback
+    def _async_start_timeout(self, _now: datetime) -> None:
+        _LOGGER.debug(
+            "%s never reported brewing, sending the next command", self._device.id
+        )
+        self._unsub_start = None
+        self._async_check()
+
+    @callback
+    def _async_cancel_start_timer(self) -> None:
+        if self._unsub_start is not None:
+            self._unsub_start()
+            self._unsub_start = None
+
+    @callback
+    def _async_expire(self, command: _QueuedCommand, _now: datetime) -> None:
+        command.unsub_expiry = None
+        if self._async_discard(command) and not command.future.done():
+            command.future.set_exception(
+                HomeAssistantError(
+                    f"{self._device.name} wasn't ready within "
+                    f"{COMMAND_QUEUE_EXPIRY} seconds"
+                )
+            )
+
+    @callback
+    def _async_discard(self, command: _QueuedCommand) -> bool:
+        try:
+            self._queue.remove(command)
+        except ValueError:
+            return False
+        command.cancel_expiry()
+        self._notify()
+        return True
+
+    def _log_failure(self, future: asyncio.Future) -> None:
+        if not future.cancelled() and (err := future.exception()) is not None:
+            _LOGGER.warning("Queued command for %s failed: %s", self._device.name, err)
+
+    def _notify(self) -> None:
+        for listener in list(self._listeners):
+            listener()
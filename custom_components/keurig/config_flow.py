@@ -5,11 +5,24 @@ import logging
 from homeassistant.const import CONF_USERNAME
 import homeassistant.helpers.config_validation as cv
 from homeassistant import config_entries
+from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
 from pykeurig.keurigapi import KeurigApi
 from typing import Any
 import voluptuous as vol
-from .const import DOMAIN
+from .const import (
+    CONF_BREWERS,
+    CONF_CALL_TIMEOUT,
+    CONF_IMAGE_TIMEOUT,
+    CONF_MAX_PARALLEL_CALLS,
+    CONF_UPDATE_DEBOUNCE,
+    DEFAULT_CALL_TIMEOUT,
+    DEFAULT_IMAGE_TIMEOUT,
+    DEFAULT_MAX_PARALLEL_CALLS,
+    DEFAULT_UPDATE_DEBOUNCE,
+    DOMAIN,
+)
+from .tokens import export_tokens, get_token_store
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -32,6 +45,13 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> config_entries.OptionsFlow:
+        return OptionsFlowHandler(config_entry)
+
     async def async_step_reauth(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
@@ -54,6 +74,10 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             ):
                 errors["base"] = "invalid_auth"
             else:
+                if (tokens := export_tokens(self._api)) is not None:
+                    await get_token_store(self.hass).async_set(
+                        user_input["username"], tokens
+                    )
                 self._brewers = {
                     dev.id: dev.name for dev in await self._api.async_get_devices()
                 }
@@ -75,7 +99,7 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 data_schema=vol.Schema(
                     {
                         vol.Required(
-                            "brewers", default=list(self._brewers)
+                            CONF_BREWERS, default=list(self._brewers)
                         ): cv.multi_select(self._brewers)
                     }
                 ),
@@ -85,3 +109,57 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             return self.async_create_entry(
                 title=self.data[CONF_USERNAME], data=self.data
             )
+
+
+class OptionsFlowHandler(config_entries.OptionsFlow):
+    """Handle Keurig Connect options."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry):
+        self._entry = config_entry
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage the options."""
+        if user_input is not None:
+            return self.async_create_entry(title="", data=user_input)
+
+        options = self._entry.options
+        selected = options.get(CONF_BREWERS, self._entry.data.get(CONF_BREWERS))
+        brewers = {brewer_id: brewer_id for brewer_id in selected or []}
+        coordinator = self.hass.data.get(DOMAIN, {}).get(self._entry.entry_id)
+        if coordinator is not None:
+            brewers.update(coordinator.account_brewers)
+        if selected is None:
+            selected = list(brewers)
+
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(CONF_BREWERS, default=selected): cv.multi_select(
+                        brewers
+                    ),
+                    vol.Required(
+                        CONF_MAX_PARALLEL_CALLS,
+                        default=options.get(
+                            CONF_MAX_PARALLEL_CALLS, DEFAULT_MAX_PARALLEL_CALLS
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=32)),
+                    vol.Required(
+                        CONF_CALL_TIMEOUT,
+                        default=options.get(CONF_CALL_TIMEOUT, DEFAULT_CALL_TIMEOUT),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=120)),
+                    vol.Required(
+                        CONF_IMAGE_TIMEOUT,
+                        default=options.get(CONF_IMAGE_TIMEOUT, DEFAULT_IMAGE_TIMEOUT),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=120)),
+                    vol.Required(
+                        CONF_UPDATE_DEBOUNCE,
+                        default=options.get(
+                            CONF_UPDATE_DEBOUNCE, DEFAULT_UPDATE_DEBOUNCE
+                        ),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0, max=10)),
+                }
+            ),
+        )
@@ -3,6 +3,66 @@
 DOMAIN = "keurig"
 MANUFACTURER = "Keurig"
 
+CONF_BREWERS = "brewers"
+CONF_MAX_PARALLEL_CALLS = "max_parallel_calls"
+CONF_CALL_TIMEOUT = "call_timeout"
+CONF_UPDATE_DEBOUNCE = "update_debounce"
+CONF_IMAGE_TIMEOUT = "image_timeout"
+
+DEFAULT_MAX_PARALLEL_CALLS = 4
+DEFAULT_CALL_TIMEOUT = 15
+DEFAULT_UPDATE_DEBOUNCE = 0
+DEFAULT_IMAGE_TIMEOUT = 10
+
+# Seconds between coordinator refreshes, which check the push connection and
+# only hit the cloud while it is down or has been quiet for PUSH_STALE_AFTER
+# seconds, a backstop for drops the connection state doesn't show
+UPDATE_INTERVAL = 30
+PUSH_STALE_AFTER = 2 * 60
+RECONNECT_MIN_DELAY = 2
+RECONNECT_MAX_DELAY = 5 * 60
+# Consecutive cloud failures that open an account's circuit breaker, and the
+# seconds before it lets a probe call through
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_RESET_TIMEOUT = 30
+# Brew commands wait in a per-brewer queue until the brewer reports ready
+COMMAND_QUEUE_MAX_DEPTH = 10
+COMMAND_QUEUE_EXPIRY = 15 * 60
+# Seconds to wait for a sent brew to start before sending the next one anyway
+COMMAND_START_TIMEOUT = 30
+
+# Brews kept per brewer, older ones only survive in the long-term statistics
+BREW_HISTORY_MAX_ROWS = 1000
+
+# Seconds a brew service waits for the brew to finish when asked to
+BREW_WAIT_TIMEOUT = 15 * 60
+
+BREWER_STATUS_READY = "BREW_READY"
+BREWER_STATUS_BREWING = "BREW_IN_PROGRESS"
+BREWER_STATUS_SUCCESSFUL = "BREW_SUCCESSFUL"
+BREWER_STATUS_CANCELING = "BREW_CANCELING"
+BREWER_STATUS_LOCKED = "BREW_LOCKED"
+# Reported with BREW_LOCKED after a normal brew until the used pod is removed
+BREWER_ERROR_POD_NOT_REMOVED = "PM_NOT_CYCLED"
+
+DATA_IMAGE_CACHE = "keurig_image_cache"
+DATA_RESOLVER = "keurig_resolver"
+DATA_BREWERS = "keurig_brewers"
+DATA_SESSIONS = "keurig_sessions"
+DATA_METRICS = "keurig_metrics"
+DATA_TOKEN_STORE = "keurig_token_store"
+DATA_HISTORY = "keurig_history"
+DATA_FAVORITES = "keurig_favorites"
+DATA_PREFETCHER = "keurig_prefetcher"
+DATA_SHARED_SENSORS = "keurig_shared_sensors"
+# Rebuildable artwork, kept out of .storage so it stays out of backups
+IMAGE_CACHE_DIR = ".cache/keurig_images"
+IMAGE_CACHE_MAX_BYTES = 32 * 1024 * 1024
+IMAGE_CACHE_MAX_DISK_BYTES = 256 * 1024 * 1024
+# Pod artwork is prefetched one image at a time, this many seconds apart
+PREFETCH_INTERVAL = 2
+PREFETCH_MAX_PENDING = 50
+
 SERVICE_BREW_HOT_WATER = "brew_hot_water"
 SERVICE_BREW_HOT = "brew_hot"
 SERVICE_BREW_ICED = "brew_iced"
@@ -15,10 +75,12 @@ SERVICE_DELETE_FAVORITE = "delete_favorite"
 
 ATTR_SIZE = "size"
 ATTR_INTENSITY = "intensity"
+ATTR_WAIT = "wait"
+ATTR_FAVORITE_ID = "favorite_id"
 ATTR_POD_BRAND = "pod_brand"
 ATTR_POD_VARIETY = "pod_variety"
 ATTR_POD_ROAST_TYPE = "pod_roast_type"
 ATTR_POD_IS_TEA = "pod_is_tea"
 ATTR_POD_IS_ICED = "pod_is_iced"
 ATTR_POD_IS_FLAVORED = "pod_is_flavored"
-ATTR_POD_IS_POWDERED = "pod_is_powdered"
\ No newline at end of file
+ATTR_POD_IS_POWDERED = "pod_is_powdered"
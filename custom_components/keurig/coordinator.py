@@ -0,0 +1,328 @@
+"""Coordinator for the Keurig Connect integration."""
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass
+from datetime import timedelta
+from functools import partial
+import logging
+from typing import TYPE_CHECKING
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.exceptions import ConfigEntryAuthFailed, ConfigEntryNotReady
+from homeassistant.helpers import device_registry, entity_registry
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from pykeurig.keurigapi import UnauthorizedException
+
+from .command_queue import BrewerCommandQueue
+from .const import (
+    CONF_BREWERS,
+    CONF_IMAGE_TIMEOUT,
+    DATA_PREFETCHER,
+    DEFAULT_IMAGE_TIMEOUT,
+    DOMAIN,
+    UPDATE_INTERVAL,
+)
+from .favorites import FavoritesCatalog, get_favorites_store
+from .history import BrewCycleDetector, get_brew_history
+from .metrics import get_metrics
+from .prefetch import ArtworkPrefetcher
+from .session import KeurigSession
+from .views import IMAGE_KINDS
+
+if TYPE_CHECKING:
+    from pykeurig.keurigdevice import KeurigDevice
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class BrewerSnapshot:
+    """The state of a brewer at a point in time."""
+
+    appliance_status: str | None
+    brewer_status: str | None
+    errors: tuple[str, ...]
+    pod_status: str | None
+    pod_brand_id: str | None
+    pod_variety_id: str | None
+
+    @classmethod
+    def from_device(cls, device: KeurigDevice) -> BrewerSnapshot:
+        return cls(
+            appliance_status=device.appliance_status,
+            brewer_status=device.brewer_status,
+            errors=tuple(device.errors or ()),
+            pod_status=device.pod_status,
+            pod_brand_id=device.pod_brand_id,
+            pod_variety_id=device.pod_variety_id,
+        )
+
+
+class KeurigCoordinator(DataUpdateCoordinator[dict[str, BrewerSnapshot]]):
+    """Supervises the push connection and keeps a snapshot of every brewer.
+
+    Brewers are normally updated by push. Each refresh only checks the push
+    connection, polling the cloud while it is down or has been quiet for long
+    enough that it may have silently died.
+    """
+
+    def __init__(self, hass: HomeAssistant, session: KeurigSession, entry: ConfigEntry):
+        """Initialize my coordinator."""
+        super().__init__(
+            hass,
+            _LOGGER,
+            # Name of the data. For logging purposes.
+            name="Keurig",
+            update_interval=timedelta(seconds=UPDATE_INTERVAL),
+        )
+        self.session = session
+        self.metrics = get_metrics(hass)
+        self.api = session.api
+        self.hass: HomeAssistant = hass
+        self.entry = entry
+        self._devices = None
+        self._account_brewers: dict[str, str] = {}
+        self._devices_by_id: dict[str, KeurigDevice] = {}
+        # entity_id -> brewer, rebuilt lazily after the device list or either
+        # registry changes
+        self._devices_by_entity_id: dict[str, KeurigDevice] | None = None
+        self._device_lock = asyncio.Lock()
+        self._command_queues: dict[str, BrewerCommandQueue] = {}
+        self._favorites: dict[str, FavoritesCatalog] = {}
+        self._brew_detectors: dict[str, BrewCycleDetector] = {}
+        # (brewer id, image kind) -> the image id last seen in that brewer
+        self._pod_images: dict[tuple[str, str], str] = {}
+
+        for event in (
+            device_registry.EVENT_DEVICE_REGISTRY_UPDATED,
+            entity_registry.EVENT_ENTITY_REGISTRY_UPDATED,
+        ):
+            entry.async_on_unload(
+                hass.bus.async_listen(event, self._async_invalidate_registry_index)
+            )
+
+    async def get_devices(self):
+        if self._devices is not None:
+            return self._devices
+        async with self._device_lock:
+            if self._devices is None:
+                try:
+                    self._set_devices(await self.session.async_get_devices())
+                except UnauthorizedException as err:
+                    raise ConfigEntryAuthFailed from err
+            return self._devices
+
+    @property
+    def selected_brewers(self) -> list[str] | None:
+        """Return the brewer ids chosen for this entry, None meaning all."""
+        return self.entry.options.get(CONF_BREWERS, self.entry.data.get(CONF_BREWERS))
+
+    @property
+    def account_brewers(self) -> dict[str, str]:
+        """Return the name of every brewer on the account, selected or not."""
+        return self._account_brewers
+
+    @property
+    def devices(self) -> list[KeurigDevice]:
+        """Return the brewers loaded by async_refresh_devices."""
+        return self._devices or []
+
+    async def async_refresh_devices(self) -> None:
+        """Fetch the brewer list and update every brewer concurrently."""
+        if (devices := await self.get_devices()) is None:
+            raise ConfigEntryNotReady("Failed to retrieve Keurig devices")
+
+        results = await asyncio.gather(
+            *(self.session.async_call(device.async_update) for device in devices),
+            return_exceptions=True,
+        )
+        for device, result in zip(devices, results):
+            if isinstance(result, (ConfigEntryAuthFailed, UnauthorizedException)):
+                raise ConfigEntryAuthFailed from result
+            if isinstance(result, Exception):
+                _LOGGER.warning("Failed to update brewer %s: %s", device.id, result)
+
+    @callback
+    def async_remove_deselected_devices(self) -> None:
+        """Detach registry devices for brewers no longer selected."""
+        device_reg = device_registry.async_get(self.hass)
+        for device_entry in device_registry.async_entries_for_config_entry(
+            device_reg, self.entry.entry_id
+        ):
+            if not any(
+                domain == DOMAIN and identifier in self._devices_by_id
+                for domain, identifier in device_entry.identifiers
+            ):
+                device_reg.async_update_device(
+                    device_entry.id, remove_config_entry_id=self.entry.entry_id
+                )
+
+    async def async_get_device(self, device_id: str) -> KeurigDevice | None:
+        """Return the brewer with the given Keurig id."""
+        if self._devices is None:
+            await self.get_devices()
+        return self._devices_by_id.get(device_id)
+
+    @callback
+    def get_command_queue(self, device: KeurigDevice) -> BrewerCommandQueue:
+        """Return the brew command queue of a brewer."""
+        if (queue := self._command_queues.get(device.id)) is None:
+            queue = self._command_queues[device.id] = BrewerCommandQueue(
+                self.hass, self, device
+            )
+            self.entry.async_on_unload(queue.async_shutdown)
+        return queue
+
+    async def async_load_favorites(self) -> None:
+        """Load the stored favorites catalogs, needed before get_favorites."""
+        await get_favorites_store(self.hass).async_load()
+
+    @callback
+    def get_favorites(self, device: KeurigDevice) -> FavoritesCatalog:
+        """Return the favorites catalog of a brewer."""
+        if (catalog := self._favorites.get(device.id)) is None:
+            catalog = self._favorites[device.id] = FavoritesCatalog(
+                device, get_favorites_store(self.hass)
+            )
+        return catalog
+
+    async def async_track_brews(self) -> None:
+        """Start recording every brewer's brews in the brew history."""
+        history = get_brew_history(self.hass)
+        await history.async_load()
+        for device in self.devices:
+            detector = self._brew_detectors[device.id] = BrewCycleDetector(
+                history, self, device
+            )
+            self.entry.async_on_unload(detector.async_shutdown)
+
+    @callback
+    def async_track_pods(self) -> None:
+        """Prefetch pod artwork whenever a brewer reports a new pod."""
+        prefetcher: ArtworkPrefetcher = self.hass.data[DATA_PREFETCHER]
+        for device in self.devices:
+            self.entry.async_on_unload(
+                self.session.async_add_push_listener(
+                    device.id, partial(self._async_check_pod, prefetcher, device)
+                )
+            )
+            self._async_check_pod(prefetcher, device)
+
+        @callback
+        def check_all() -> None:
+            for device in self.devices:
+                self._async_check_pod(prefetcher, device)
+
+        self.entry.async_on_unload(self.async_add_listener(check_all))
+
+    @callback
+    def _async_check_pod(
+        self, prefetcher: ArtworkPrefetcher, device: KeurigDevice
+    ) -> None:
+        for kind, (attribute, fetch_method) in IMAGE_KINDS.items():
+            image_id = getattr(device, attribute)
+            key = (device.id, kind)
+            if image_id is None or self._pod_images.get(key) == image_id:
+                continue
+            if prefetcher.async_schedule(
+                kind,
+                image_id,
+                partial(
+                    self.session.async_call,
+                    getattr(self.api, fetch_method),
+                    timeout=self.entry.options.get(
+                        CONF_IMAGE_TIMEOUT, DEFAULT_IMAGE_TIMEOUT
+                    ),
+                ),
+            ):
+                # Otherwise the next update offers it again
+                self._pod_images[key] = image_id
+
+    @callback
+    def note_brew_size(self, device_id: str, size: int | None) -> None:
+        """Remember the size of a brew sent by a service for the history."""
+        if (detector := self._brew_detectors.get(device_id)) is not None:
+            detector.async_note_size(size)
+
+    @callback
+    def get_device_by_entity_id(self, entity_id: str) -> KeurigDevice | None:
+        """Return the brewer owning an entity."""
+        if self._devices_by_entity_id is None:
+            self._build_registry_index()
+        return self._devices_by_entity_id.get(entity_id)
+
+    def _set_devices(self, devices) -> None:
+        if devices is not None:
+            self._account_brewers = {dev.id: dev.name for dev in devices}
+            if (selected := self.selected_brewers) is not None:
+                devices = [dev for dev in devices if dev.id in selected]
+        self._devices = devices
+        self._devices_by_id = {dev.id: dev for dev in devices or []}
+        self._devices_by_entity_id = None
+
+    @callback
+    def _build_registry_index(self) -> None:
+        device_reg = device_registry.async_get(self.hass)
+        entity_reg = entity_registry.async_get(self.hass)
+
+        by_registry_id = {}
+        for device_entry in device_registry.async_entries_for_config_entry(
+            device_reg, self.entry.entry_id
+        ):
+            for domain, identifier in device_entry.identifiers:
+                if domain == DOMAIN and identifier in self._devices_by_id:
+                    by_registry_id[device_entry.id] = self._devices_by_id[identifier]
+
+        self._devices_by_entity_id = {
+            entity.entity_id: by_registry_id[entity.device_id]
+            for entity in entity_registry.async_entries_for_config_entry(
+                entity_reg, self.entry.entry_id
+            )
+            if entity.device_id in by_registry_id
+        }
+
+    @callback
+    def _async_invalidate_registry_index(self, event: Event) -> None:
+        self._devices_by_entity_id = None
+
+    def _snapshot(self) -> dict[str, BrewerSnapshot]:
+        return {dev.id: BrewerSnapshot.from_device(dev) for dev in self.devices}
+
+    async def _async_poll(self) -> None:
+        with self.metrics.track("poll"):
+            results = await asyncio.gather(
+                *(
+                    self.session.async_call(device.async_update)
+                    for device in self.devices
+                ),
+                return_exceptions=True,
+            )
+        for result in results:
+            if isinstance(result, (ConfigEntryAuthFailed, UnauthorizedException)):
+                raise ConfigEntryAuthFailed from result
+        if results and all(isinstance(result, Exception) for result in results):
+            raise UpdateFailed(f"Unable to update Keurig brewers: {results[0]}")
+
+    async def _async_update_data(self) -> dict[str, BrewerSnapshot]:
+        session = self.session
+        session.async_check_push()
+        if not session.push_connected:
+            await session.async_connect()
+
+        if session.push_connected and not session.push_stale:
+            return self._snapshot()
+
+        pushed = self._snapshot()
+        await self._async_poll()
+        polled = self._snapshot()
+
+        if session.push_connected:
+            if polled == pushed:
+                # Quiet but consistent with the cloud, the brewers are just idle
+                session.mark_push_alive()
+            else:
+                _LOGGER.debug("Push updates were missed, reconnecting")
+                session.async_schedule_reconnect()
+        return polled
@@ -0,0 +1,42 @@
+"""Diagnostics support for the Keurig Connect integration."""
+from __future__ import annotations
+
+from dataclasses import asdict
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_PASSWORD, CONF_USERNAME
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN
+from .coordinator import KeurigCoordinator
+from .metrics import get_metrics
+
+TO_REDACT = {CONF_USERNAME, CONF_PASSWORD}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator: KeurigCoordinator = hass.data[DOMAIN][entry.entry_id]
+    session = coordinator.session
+
+    return {
+        "entry": {
+            "data": async_redact_data(dict(entry.data), TO_REDACT),
+            "options": dict(entry.options),
+        },
+        "session": {
+            "entries": len(session.entry_ids),
+            "push_connected": session.push_connected,
+            "push_stale": session.push_stale,
+            "breaker": session.breaker.as_dict(),
+        },
+        "brewers": {
+            brewer_id: asdict(snapshot)
+            for brewer_id, snapshot in (coordinator.data or {}).items()
+        },
+        "metrics": get_metrics(hass).as_dict(),
+    }
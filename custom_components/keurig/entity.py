@@ -0,0 +1,100 @@
+"""Base entity for the Keurig Connect integration."""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+from homeassistant.core import CALLBACK_TYPE, callback
+from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .const import (
+    CONF_UPDATE_DEBOUNCE,
+    DEFAULT_UPDATE_DEBOUNCE,
+    DOMAIN,
+    MANUFACTURER,
+)
+from .coordinator import KeurigCoordinator
+
+
+class KeurigEntity(CoordinatorEntity[KeurigCoordinator]):
+    """A Keurig entity that only writes state when it actually changed.
+
+    Bursts of push callbacks can optionally be collapsed into one write per
+    entity using the update debounce option.
+    """
+
+    def __init__(self, device, coordinator: KeurigCoordinator):
+        super().__init__(coordinator)
+        self._device = device
+        self._last_written: tuple | None = None
+        self._unsub_debounce: CALLBACK_TYPE | None = None
+
+        self._attr_has_entity_name = True
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, device.id)},
+            manufacturer=MANUFACTURER,
+            name=device.name,
+            model=device.model,
+            sw_version=device.sw_version,
+        )
+        self._update_attrs()
+
+    def _update_attrs(self) -> None:
+        """Refresh the _attr_ values from the brewer."""
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.coordinator.session.async_add_push_listener(
+                self._device.id, self._async_handle_update
+            )
+        )
+        self.async_on_remove(self._async_cancel_debounce)
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        self._async_handle_update()
+
+    @callback
+    def _async_handle_update(self) -> None:
+        debounce = self.coordinator.entry.options.get(
+            CONF_UPDATE_DEBOUNCE, DEFAULT_UPDATE_DEBOUNCE
+        )
+        if not debounce:
+            self._async_write_if_changed()
+        elif self._unsub_debounce is None:
+            self._unsub_debounce = async_call_later(
+                self.hass, debounce, self._async_debounce_elapsed
+            )
+
+    @callback
+    def _async_debounce_elapsed(self, _now: datetime) -> None:
+        self._unsub_debounce = None
+        self._async_write_if_changed()
+
+    @callback
+    def _async_cancel_debounce(self) -> None:
+        if self._unsub_debounce is not None:
+            self._unsub_debounce()
+            self._unsub_debounce = None
+
+    @callback
+    def _async_write_if_changed(self) -> None:
+        self._update_attrs()
+        if self._snapshot() != self._last_written:
+            self.async_write_ha_state()
+
+    @callback
+    def async_write_ha_state(self) -> None:
+        self._last_written = self._snapshot()
+        super().async_write_ha_state()
+
+    def _snapshot(self) -> tuple[Any, ...]:
+        return (
+            self.available,
+            self.state,
+            self.entity_picture,
+            self.extra_state_attributes,
+        )
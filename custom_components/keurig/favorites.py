@@ -0,0 +1,122 @@
+"""Cached favorites catalog for the Keurig Connect integration."""
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import astuple, dataclass
+from functools import partial
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DATA_FAVORITES, DOMAIN
+
+if TYPE_CHECKING:
+    from pykeurig.keurigdevice import KeurigDevice
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.favorites"
+SAVE_DELAY = 10
+
+
+@dataclass(frozen=True)
+class Favorite:
+    id: str
+    name: str
+    size: int | None = None
+    temperature: int | None = None
+    intensity: int | None = None
+
+
+class FavoritesStore:
+    """Every brewer's favorites, persisted since pykeurig can't list them."""
+
+    def __init__(self, hass: HomeAssistant):
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._data: dict[str, list[list[Any]]] | None = None
+
+    async def async_load(self) -> None:
+        if self._data is None:
+            self._data = await self._store.async_load() or {}
+
+    @callback
+    def async_get(self, brewer_id: str) -> list[Favorite]:
+        return [Favorite(*row) for row in self._data.get(brewer_id, ())]
+
+    @callback
+    def async_set(self, brewer_id: str, favorites: list[Favorite]) -> None:
+        self._data[brewer_id] = [list(astuple(favorite)) for favorite in favorites]
+        self._store.async_delay_save(lambda: self._data, SAVE_DELAY)
+
+
+class FavoritesCatalog:
+    """A brewer's favorites, as known from the favorite services.
+
+    pykeurig has no call listing a brewer's favorites, so the catalog only holds
+    favorites updated through update_favorite and is never fetched from the
+    cloud. It is persisted in the FavoritesStore, which must be loaded before
+    any catalog is created.
+    """
+
+    def __init__(self, device: KeurigDevice, store: FavoritesStore):
+        self._device = device
+        self._store = store
+        self._favorites: dict[str, Favorite] = {
+            favorite.id: favorite for favorite in store.async_get(device.id)
+        }
+        self._listeners: list[Callable[[], None]] = []
+        # Brewed by brew_favorite when neither an id nor a name is given
+        self.selected_id: str | None = None
+
+    @property
+    def favorites(self) -> list[Favorite]:
+        return list(self._favorites.values())
+
+    @callback
+    def async_add_listener(self, listener: Callable[[], None]) -> CALLBACK_TYPE:
+        """Call listener whenever the catalog changes."""
+        self._listeners.append(listener)
+        return partial(self._listeners.remove, listener)
+
+    @callback
+    def async_get(self, favorite_id: str) -> Favorite | None:
+        return self._favorites.get(str(favorite_id))
+
+    @callback
+    def async_find(self, name: str) -> Favorite | None:
+        """Return the favorite with the given name, ignoring case."""
+        name = name.casefold()
+        return next(
+            (
+                favorite
+                for favorite in self._favorites.values()
+                if favorite.name.casefold() == name
+            ),
+            None,
+        )
+
+    @property
+    def selected(self) -> Favorite | None:
+        return None if self.selected_id is None else self.async_get(self.selected_id)
+
+    @callback
+    def async_set(self, favorite: Favorite) -> None:
+        self._favorites[favorite.id] = favorite
+        self._changed()
+
+    @callback
+    def async_remove(self, favorite_id: str) -> None:
+        if self._favorites.pop(str(favorite_id), None) is not None:
+            self._changed()
+
+    def _changed(self) -> None:
+        self._store.async_set(self._device.id, self.favorites)
+        for listener in list(self._listeners):
+            listener()
+
+
+@callback
+def get_favorites_store(hass: HomeAssistant) -> FavoritesStore:
+    if DATA_FAVORITES not in hass.data:
+        hass.data[DATA_FAVORITES] = FavoritesStore(hass)
+    return hass.data[DATA_FAVORITES]
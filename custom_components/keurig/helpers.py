@@ -1,107 +1,138 @@
-from .const import DOMAIN
-from homeassistant.config_entries import ConfigEntryState
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers import device_registry, entity_registry
-from homeassistant.helpers.device_registry import DeviceEntry, DeviceRegistry
-
-
-def get_brewers_for_service(hass: HomeAssistant, area_ids, device_ids, entity_ids):
-    matched_devices = []
-
-    if area_ids is not None:
-        matched_devices = get_brewers_by_area_id(
-            hass,
-            device_registry.async_get(hass),
-            entity_registry.async_get(hass),
-            area_ids,
-            matched_devices,
-        )
-    if device_ids is not None:
-        matched_devices = get_brewers_by_device_id(
-            hass, device_registry.async_get(hass), device_ids, matched_devices
-        )
-
-    if entity_ids is not None:
-        matched_devices = get_brewers_by_entity_id(
-            hass,
-            device_registry.async_get(hass),
-            entity_registry.async_get(hass),
-            entity_ids,
-            matched_devices,
-        )
-    return matched_devices
-
-
-def get_brewers_by_area_id(
-    hass: HomeAssistant,
-    device_reg: DeviceRegistry,
-    entity_reg: entity_registry.EntityRegistry,
-    area_ids,
-    matched_devices=[],
-):
-    for area_id in area_ids:
-        devices = device_registry.async_entries_for_area(device_reg, area_id)
-        device_ids = []
-        [device_ids.append(x.id) for x in devices if x.id not in device_ids]
-        entities = entity_registry.async_entries_for_area(entity_reg, area_id)
-        entity_ids = []
-        [entity_ids.append(x.id) for x in entities if x.id not in entity_ids]
-
-        devices_from_registry = get_brewers_by_device_id(hass, device_reg, device_ids)
-
-        [
-            matched_devices.append(x)
-            for x in devices_from_registry
-            if x not in matched_devices
-        ]
-
-    return matched_devices
-
-
-def get_brewers_by_device_id(
-    hass: HomeAssistant, device_reg: DeviceRegistry, device_ids, matched_devices=[]
-):
-    for device_id in device_ids:
-        device_entry = device_reg.async_get(device_id)
-
-        if is_device_brewer(hass, device_entry):
-            api_name = next(iter(device_entry.identifiers))[1]
-            if not api_name in matched_devices:
-                matched_devices.append(api_name)
-    return matched_devices
-
-
-def get_brewers_by_entity_id(
-    hass: HomeAssistant,
-    device_reg: DeviceRegistry,
-    entity_reg: entity_registry.EntityRegistry,
-    entity_ids,
-    matched_devices=[],
-):
-    for entity_id in entity_ids:
-        entity = entity_reg.async_get(entity_id)
-        if entity is not None:
-            [
-                matched_devices.append(x)
-                for x in get_brewers_by_device_id(hass, device_reg, [entity.device_id])
-                if x not in matched_devices
-            ]
-    return matched_devices
-
-
-def is_device_brewer(hass: HomeAssistant, device: DeviceEntry):
-    config_entry_ids = device.config_entries
-    entry = next(
-        (
-            entry
-            for entry in hass.config_entries.async_entries(DOMAIN)
-            if entry.entry_id in config_entry_ids
-        ),
-        None,
-    )
-    if entry and entry.state != ConfigEntryState.LOADED:
-        return False
-    if entry is None or entry.entry_id not in hass.data[DOMAIN]:
-        return False
-
-    return True
+from __future__ import annotations
+
+from collections.abc import Iterable
+
+from .const import DATA_BREWERS, DATA_RESOLVER, DOMAIN
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers import area_registry, device_registry, entity_registry
+from homeassistant.helpers.device_registry import DeviceEntry
+
+
+def get_brewers_for_service(
+    hass: HomeAssistant, area_ids, device_ids, entity_ids
+) -> list[str]:
+    return get_resolver(hass).resolve(area_ids, device_ids, entity_ids)
+
+
+@callback
+def get_coordinator_for_brewer(hass: HomeAssistant, brewer_id: str):
+    """Return the coordinator of the config entry that loaded a brewer."""
+    return hass.data.get(DATA_BREWERS, {}).get(brewer_id)
+
+
+@callback
+def get_coordinator_for_entity(hass: HomeAssistant, entity_id: str):
+    """Return the coordinator of the config entry that owns an entity."""
+    if (entity := entity_registry.async_get(hass).async_get(entity_id)) is None:
+        return None
+    return hass.data.get(DOMAIN, {}).get(entity.config_entry_id)
+
+
+@callback
+def get_resolver(hass: HomeAssistant) -> BrewerResolver:
+    if DATA_RESOLVER not in hass.data:
+        hass.data[DATA_RESOLVER] = BrewerResolver(hass)
+    return hass.data[DATA_RESOLVER]
+
+
+class BrewerResolver:
+    """Resolve service targets to Keurig brewer ids.
+
+    Results are cached per area, device and entity and dropped whenever one of
+    the registries changes or a Keurig config entry is set up or unloaded.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        self._hass = hass
+        self._loaded_entries: frozenset[str] | None = None
+        self._by_area: dict[str, frozenset[str]] = {}
+        self._by_device: dict[str, frozenset[str]] = {}
+        self._by_entity: dict[str, frozenset[str]] = {}
+
+        for event in (
+            area_registry.EVENT_AREA_REGISTRY_UPDATED,
+            device_registry.EVENT_DEVICE_REGISTRY_UPDATED,
+            entity_registry.EVENT_ENTITY_REGISTRY_UPDATED,
+        ):
+            hass.bus.async_listen(event, self.async_invalidate)
+
+    @callback
+    def async_invalidate(self, event: Event | None = None) -> None:
+        self._loaded_entries = None
+        self._by_area.clear()
+        self._by_device.clear()
+        self._by_entity.clear()
+
+    @callback
+    def resolve(self, area_ids, device_ids, entity_ids) -> list[str]:
+        matched: dict[str, None] = {}
+        for area_id in _as_list(area_ids):
+            matched.update(dict.fromkeys(self._resolve_area(area_id)))
+        for device_id in _as_list(device_ids):
+            matched.update(dict.fromkeys(self._resolve_device(device_id)))
+        for entity_id in _as_list(entity_ids):
+            matched.update(dict.fromkeys(self._resolve_entity(entity_id)))
+        return list(matched)
+
+    def _resolve_area(self, area_id: str) -> frozenset[str]:
+        if (brewers := self._by_area.get(area_id)) is None:
+            device_reg = device_registry.async_get(self._hass)
+            entity_reg = entity_registry.async_get(self._hass)
+            device_ids = {
+                device.id
+                for device in device_registry.async_entries_for_area(
+                    device_reg, area_id
+                )
+            }
+            device_ids.update(
+                entity.device_id
+                for entity in entity_registry.async_entries_for_area(
+                    entity_reg, area_id
+                )
+                if entity.device_id is not None
+            )
+            brewers = frozenset().union(
+                *(self._resolve_device(device_id) for device_id in device_ids)
+            )
+            self._by_area[area_id] = brewers
+        return brewers
+
+    def _resolve_device(self, device_id: str) -> frozenset[str]:
+        if (brewers := self._by_device.get(device_id)) is None:
+            device_entry = device_registry.async_get(self._hass).async_get(device_id)
+            brewers = frozenset()
+            if device_entry is not None and self._is_device_brewer(device_entry):
+                brewers = frozenset(
+                    identifier
+                    for domain, identifier in device_entry.identifiers
+                    if domain == DOMAIN
+                )
+            self._by_device[device_id] = brewers
+        return brewers
+
+    def _resolve_entity(self, entity_id: str) -> frozenset[str]:
+        if (brewers := self._by_entity.get(entity_id)) is None:
+            entity = entity_registry.async_get(self._hass).async_get(entity_id)
+            brewers = frozenset()
+            if entity is not None and entity.device_id is not None:
+                brewers = self._resolve_device(entity.device_id)
+            self._by_entity[entity_id] = brewers
+        return brewers
+
+    def _is_device_brewer(self, device: DeviceEntry) -> bool:
+        if self._loaded_entries is None:
+            loaded = self._hass.data.get(DOMAIN, {})
+            self._loaded_entries = frozenset(
+                entry.entry_id
+                for entry in self._hass.config_entries.async_entries(DOMAIN)
+                if entry.entry_id in loaded
+            )
+        return not self._loaded_entries.isdisjoint(device.config_entries)
+
+
+def _as_list(value) -> Iterable[str]:
+    if value is None:
+        return ()
+    if isinstance(value, str):
+        return (value,)
+    return value
@@ -0,0 +1,214 @@
+"""Brew history and statistics for the Keurig Connect integration."""
+from __future__ import annotations
+
+from dataclasses import astuple, dataclass
+from datetime import datetime, timedelta
+import time
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util, slugify
+
+from .const import (
+    BREW_HISTORY_MAX_ROWS,
+    BREWER_ERROR_POD_NOT_REMOVED,
+    BREWER_STATUS_BREWING,
+    BREWER_STATUS_CANCELING,
+    COMMAND_START_TIMEOUT,
+    DATA_HISTORY,
+    DOMAIN,
+)
+
+if TYPE_CHECKING:
+    from pykeurig.keurigdevice import KeurigDevice
+
+    from .coordinator import KeurigCoordinator
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.brew_history"
+SAVE_DELAY = 30
+
+
+@dataclass(frozen=True)
+class BrewRecord:
+    """One finished brew, stored as a plain row to keep the history compact."""
+
+    timestamp: int
+    size: int | None
+    pod_brand: str | None
+    pod_variety: str | None
+    duration: float
+
+    @classmethod
+    def from_row(cls, row: list[Any]) -> BrewRecord:
+        return cls(*row)
+
+
+class BrewHistory:
+    """The most recent brews of every brewer, and hourly brew counts imported
+    as long-term statistics so usage over months needs no state history."""
+
+    def __init__(self, hass: HomeAssistant):
+        self._hass = hass
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._data: dict[str, dict[str, Any]] | None = None
+
+    async def async_load(self) -> None:
+        if self._data is None:
+            self._data = await self._store.async_load() or {}
+
+    @callback
+    def async_get(self, brewer_id: str) -> list[BrewRecord]:
+        brewer = self._data.get(brewer_id, {})
+        return [BrewRecord.from_row(row) for row in brewer.get("brews", ())]
+
+    @callback
+    def async_record(self, device: KeurigDevice, record: BrewRecord) -> None:
+        brewer = self._data.setdefault(device.id, {"total": 0, "brews": []})
+        brewer["total"] += 1
+        brewer["brews"].append(list(astuple(record)))
+        del brewer["brews"][:-BREW_HISTORY_MAX_ROWS]
+        self._store.async_delay_save(lambda: self._data, SAVE_DELAY)
+        self._async_import_statistics(device, brewer, record)
+
+    @callback
+    def _async_import_statistics(
+        self, device: KeurigDevice, brewer: dict[str, Any], record: BrewRecord
+    ) -> None:
+        if "recorder" not in self._hass.config.components:
+            return
+        # Only imported once the recorder is loaded, it pulls in SQLAlchemy
+        # pylint: disable=import-outside-toplevel
+        from homeassistant.components.recorder.models import (
+            StatisticData,
+            StatisticMetaData,
+        )
+        from homeassistant.components.recorder.statistics import (
+            async_add_external_statistics,
+        )
+
+        hour = dt_util.utc_from_timestamp(record.timestamp).replace(
+            minute=0, second=0, microsecond=0
+        )
+        start, end = hour.timestamp(), (hour + timedelta(hours=1)).timestamp()
+        async_add_external_statistics(
+            self._hass,
+            StatisticMetaData(
+                has_mean=False,
+                has_sum=True,
+                name=f"{device.name} brews",
+                source=DOMAIN,
+                statistic_id=f"{DOMAIN}:brews_{slugify(device.id)}",
+                unit_of_measurement=None,
+            ),
+            [
+                StatisticData(
+                    start=hour,
+                    state=sum(1 for row in brewer["brews"] if start <= row[0] < end),
+                    sum=brewer["total"],
+                )
+            ],
+        )
+
+
+class BrewCycleDetector:
+    """Turn one brewer's status updates into BrewRecords.
+
+    A brew ends with whatever status follows BREW_IN_PROGRESS, usually
+    BREW_LOCKED until the pod is removed and only occasionally BREW_SUCCESSFUL.
+    Canceled brews and brews ending in an error other than that are dropped.
+    """
+
+    def __init__(
+        self,
+        history: BrewHistory,
+        coordinator: KeurigCoordinator,
+        device: KeurigDevice,
+    ):
+        self._hass = coordinator.hass
+        self._history = history
+        self._device = device
+        self._status = device.brewer_status
+        self._started: tuple[float, datetime, str | None, str | None] | None = None
+        # Size of the next brew when it was started by a service call, the
+        # brewer doesn't report it
+        self._pending_size: int | None = None
+        self._unsub_pending: CALLBACK_TYPE | None = None
+        self._unsubs = [
+            coordinator.session.async_add_push_listener(
+                device.id, self._async_on_update
+            ),
+            coordinator.async_add_listener(self._async_on_update),
+        ]
+
+    @callback
+    def async_note_size(self, size: int | None) -> None:
+        """Remember the size of a brew just sent, forgotten if it never starts."""
+        self._pending_size = size
+        self._async_cancel_pending_timer()
+        if self._started is None:
+            self._unsub_pending = async_call_later(
+                self._hass, COMMAND_START_TIMEOUT, self._async_pending_timeout
+            )
+
+    @callback
+    def _async_pending_timeout(self, _now: datetime) -> None:
+        self._unsub_pending = None
+        self._pending_size = None
+
+    @callback
+    def _async_cancel_pending_timer(self) -> None:
+        if self._unsub_pending is not None:
+            self._unsub_pending()
+            self._unsub_pending = None
+
+    @callback
+    def async_shutdown(self) -> None:
+        self._async_cancel_pending_timer()
+        for unsub in self._unsubs:
+            unsub()
+        self._unsubs.clear()
+
+    @callback
+    def _async_on_update(self) -> None:
+        status = self._device.brewer_status
+        if status == self._status:
+            return
+        self._status = status
+        if status == BREWER_STATUS_BREWING:
+            # The noted size belongs to this brew now, however long it takes
+            self._async_cancel_pending_timer()
+            # The pod may be swapped before the brew is over
+            self._started = (
+                time.monotonic(),
+                dt_util.utcnow(),
+                self._device.pod_brand,
+                self._device.pod_variety,
+            )
+            return
+        if self._started is None:
+            return
+        started_monotonic, started_at, pod_brand, pod_variety = self._started
+        self._started = None
+        size, self._pending_size = self._pending_size, None
+        errors = set(self._device.errors or ()) - {BREWER_ERROR_POD_NOT_REMOVED}
+        if status != BREWER_STATUS_CANCELING and not errors:
+            self._history.async_record(
+                self._device,
+                BrewRecord(
+                    timestamp=int(started_at.timestamp()),
+                    size=size,
+                    pod_brand=pod_brand,
+                    pod_variety=pod_variety,
+                    duration=round(time.monotonic() - started_monotonic, 1),
+                ),
+            )
+
+
+@callback
+def get_brew_history(hass: HomeAssistant) -> BrewHistory:
+    if DATA_HISTORY not in hass.data:
+        hass.data[DATA_HISTORY] = BrewHistory(hass)
+    return hass.data[DATA_HISTORY]
@@ -0,0 +1,377 @@
+"""Pod artwork cache for the Keurig Connect integration."""
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+import hashlib
+from io import BytesIO
+import logging
+import os
+import re
+
+from homeassistant.core import HomeAssistant
+
+from .metrics import KeurigMetrics
+
+_LOGGER = logging.getLogger(__name__)
+
+_UNSAFE_KEY_CHARS = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+# Output formats supported by the proxy, mapped to (Pillow format, content type)
+IMAGE_FORMATS = {
+    "png": ("PNG", "image/png"),
+    "webp": ("WEBP", "image/webp"),
+    "jpeg": ("JPEG", "image/jpeg"),
+}
+DEFAULT_IMAGE_FORMAT = "png"
+
+
+@dataclass(frozen=True)
+class CachedImage:
+    """An image held in memory, or only on disk at path, with its validator."""
+
+    body: bytes | None
+    etag: str
+    content_type: str = "image/png"
+    path: str | None = None
+
+    @classmethod
+    def from_body(cls, body: bytes, content_type: str = "image/png") -> CachedImage:
+        return cls(body, '"' + hashlib.sha1(body).hexdigest() + '"', content_type)
+
+    @classmethod
+    def from_file(
+        cls, path: str, stat: os.stat_result, content_type: str
+    ) -> CachedImage:
+        return cls(None, _file_etag(stat), content_type, path)
+
+
+class KeurigImageCache:
+    """In-memory LRU of pod artwork backed by a directory on disk.
+
+    Freshly fetched images are kept in memory, capped at max_bytes. Images found
+    on disk are never read into memory, the views send those files directly.
+    The disk store survives restarts and is capped at max_disk_bytes, evicting
+    the least recently used files. Resized and re-encoded variants are cached
+    alongside the originals.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        path: str,
+        max_bytes: int,
+        max_disk_bytes: int,
+        metrics: KeurigMetrics,
+    ):
+        self._hass = hass
+        self._metrics = metrics
+        self._path = path
+        self._max_bytes = max_bytes
+        self._entries: OrderedDict[str, CachedImage] = OrderedDict()
+        self._size = 0
+        # Images known to be on disk, without their bodies
+        self._files: dict[str, CachedImage] = {}
+        self._max_disk_bytes = max_disk_bytes
+        # Size of every file on disk, least recently used first, scanned on the
+        # first write
+        self._disk: OrderedDict[str, int] | None = None
+        self._disk_size = 0
+        # Width of each original image, variants are never wider
+        self._widths: dict[str, int] = {}
+        self._placeholders: dict[tuple[int, int, str], CachedImage] = {}
+        self._inflight: dict[str, asyncio.Task] = {}
+
+    async def async_get(
+        self,
+        kind: str,
+        image_id,
+        fetch: Callable[[str], Awaitable[bytes]],
+        width: int | None = None,
+        image_format: str = DEFAULT_IMAGE_FORMAT,
+        prefetch: bool = False,
+    ) -> CachedImage:
+        """Return the image for kind/image_id, calling fetch on a miss.
+
+        When width or a non-PNG format is requested the original is resized
+        and re-encoded in an executor, and that variant is cached as well.
+        Widths at or above the original's are served at the original size.
+        Only this outermost lookup is counted in the metrics, prefetches apart
+        from client requests.
+        """
+        try:
+            image, result = await self._async_get(
+                kind, image_id, fetch, width, image_format
+            )
+        except Exception:
+            self._metrics.record_cache("miss", prefetch)
+            raise
+        self._metrics.record_cache(result, prefetch)
+        return image
+
+    async def _async_get(
+        self,
+        kind: str,
+        image_id,
+        fetch: Callable[[str], Awaitable[bytes]],
+        width: int | None,
+        image_format: str,
+    ) -> tuple[CachedImage, str]:
+        key = _cache_key(kind, image_id)
+
+        async def fetch_original() -> bytes:
+            with self._metrics.track(f"image_{kind}"):
+                return await fetch(image_id)
+
+        async def get_original() -> CachedImage:
+            image, _ = await self._async_get(
+                kind, image_id, fetch, None, DEFAULT_IMAGE_FORMAT
+            )
+            return image
+
+        if width is not None:
+            if key not in self._widths:
+                self._widths[key] = await self._hass.async_add_executor_job(
+                    _image_width, _source(await get_original())
+                )
+            if width >= self._widths[key]:
+                width = None
+
+        if width is None and image_format == DEFAULT_IMAGE_FORMAT:
+            return await self._async_lookup(key, "image/png", fetch_original)
+
+        async def render() -> bytes:
+            return await self._hass.async_add_executor_job(
+                _render_variant, _source(await get_original()), width, image_format
+            )
+
+        return await self._async_lookup(
+            f"{key}_{width or 0}.{image_format}", IMAGE_FORMATS[image_format][1], render
+        )
+
+    async def async_contains(self, kind: str, image_id) -> bool:
+        """Return True if the original image for kind/image_id is cached."""
+        key = _cache_key(kind, image_id)
+        if key in self._entries or key in self._files:
+            return True
+        return await self._hass.async_add_executor_job(self._stat, key) is not None
+
+    async def _async_lookup(
+        self, key: str, content_type: str, produce: Callable[[], Awaitable[bytes]]
+    ) -> tuple[CachedImage, str]:
+        """Return the image for key and where it came from: memory, disk,
+        coalesced (joined an in-flight load) or miss."""
+        if (image := self._entries.get(key)) is not None:
+            self._entries.move_to_end(key)
+            return image, "memory"
+        if (image := self._files.get(key)) is not None:
+            self._touch(key)
+            return image, "disk"
+        return await self._async_single_flight(
+            key, lambda: self._async_load(key, content_type, produce)
+        )
+
+    async def _async_single_flight(
+        self, key: str, factory: Callable[[], Awaitable[tuple[CachedImage, str]]]
+    ) -> tuple[CachedImage, str]:
+        """Share one load of key between every concurrent caller.
+
+        The load runs as its own task so a caller going away doesn't cancel it
+        for the others, and a failure reaches every waiter without being cached.
+        """
+        if (task := self._inflight.get(key)) is None:
+            task = self._inflight[key] = self._hass.async_create_task(factory())
+
+            def done(finished: asyncio.Task) -> None:
+                if self._inflight.get(key) is finished:
+                    del self._inflight[key]
+
+            task.add_done_callback(done)
+            return await asyncio.shield(task)
+        image, _ = await asyncio.shield(task)
+        return image, "coalesced"
+
+    async def _async_load(
+        self, key: str, content_type: str, produce: Callable[[], Awaitable[bytes]]
+    ) -> tuple[CachedImage, str]:
+        stat = await self._hass.async_add_executor_job(self._stat, key)
+        if stat is not None:
+            self._touch(key)
+            image = self._files[key] = CachedImage.from_file(
+                self._file(key), stat, content_type
+            )
+            return image, "disk"
+
+        body = await produce()
+        stat = await self._hass.async_add_executor_job(self._write, key, body)
+        if stat is None:
+            image = CachedImage.from_body(body, content_type)
+        else:
+            # Validated like the file it will be served from after a restart
+            image = CachedImage(body, _file_etag(stat), content_type)
+            await self._async_track_file(key, stat.st_size)
+        self._store(key, image)
+        return image, "miss"
+
+    async def async_get_placeholder(
+        self,
+        width: int,
+        height: int,
+        image_format: str = DEFAULT_IMAGE_FORMAT,
+    ) -> CachedImage:
+        """Return a blank image of the given size, rendered only once."""
+        key = (width, height, image_format)
+        if (image := self._placeholders.get(key)) is None:
+            body = await self._hass.async_add_executor_job(
+                _render_placeholder, width, height, image_format
+            )
+            image = self._placeholders.setdefault(
+                key, CachedImage.from_body(body, IMAGE_FORMATS[image_format][1])
+            )
+        return image
+
+    def _store(self, key: str, image: CachedImage) -> None:
+        if len(image.body) > self._max_bytes:
+            return
+        if (old := self._entries.pop(key, None)) is not None:
+            self._size -= len(old.body)
+        self._entries[key] = image
+        self._size += len(image.body)
+        while self._size > self._max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted.body)
+
+    def _touch(self, key: str) -> None:
+        if self._disk is not None and key in self._disk:
+            self._disk.move_to_end(key)
+
+    async def _async_track_file(self, key: str, size: int) -> None:
+        """Account for a file just written and evict files over the disk cap."""
+        if self._disk is None:
+            disk = await self._hass.async_add_executor_job(self._scan)
+            if self._disk is None:
+                self._disk = disk
+                self._disk_size = sum(disk.values())
+        self._disk_size += size - self._disk.pop(key, 0)
+        self._disk[key] = size
+        evicted = []
+        while self._disk_size > self._max_disk_bytes and len(self._disk) > 1:
+            old, old_size = self._disk.popitem(last=False)
+            self._disk_size -= old_size
+            self._files.pop(old, None)
+            evicted.append(old)
+        if evicted:
+            await self._hass.async_add_executor_job(self._remove, evicted)
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self._path, key)
+
+    def _stat(self, key: str) -> os.stat_result | None:
+        try:
+            return os.stat(self._file(key))
+        except FileNotFoundError:
+            return None
+        except OSError as err:
+            _LOGGER.warning("Unable to read cached image %s: %s", key, err)
+            return None
+
+    def _scan(self) -> OrderedDict[str, int]:
+        """Return the size of every cached file, oldest first."""
+        try:
+            files = [
+                (entry.name, entry.stat())
+                for entry in os.scandir(self._path)
+                if entry.is_file() and not entry.name.endswith(".tmp")
+            ]
+        except FileNotFoundError:
+            return OrderedDict()
+        except OSError as err:
+            _LOGGER.warning("Unable to scan the image cache: %s", err)
+            return OrderedDict()
+        files.sort(key=lambda file: file[1].st_mtime)
+        return OrderedDict((name, stat.st_size) for name, stat in files)
+
+    def _write(self, key: str, body: bytes) -> os.stat_result | None:
+        try:
+            os.makedirs(self._path, exist_ok=True)
+            tmp = self._file(key) + ".tmp"
+            with open(tmp, "wb") as file:
+                file.write(body)
+            os.replace(tmp, self._file(key))
+            return os.stat(self._file(key))
+        except OSError as err:
+            _LOGGER.warning("Unable to write cached image %s: %s", key, err)
+            return None
+
+    def _remove(self, keys: list[str]) -> None:
+        for key in keys:
+            try:
+                os.remove(self._file(key))
+            except FileNotFoundError:
+                pass
+            except OSError as err:
+                _LOGGER.warning("Unable to evict cached image %s: %s", key, err)
+
+
+def _file_etag(stat: os.stat_result) -> str:
+    # The validator aiohttp's FileResponse sends for the same file
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def _cache_key(kind: str, image_id) -> str:
+    return _UNSAFE_KEY_CHARS.sub("_", f"{kind}_{image_id}")
+
+
+def _source(image: CachedImage) -> bytes | str:
+    return image.body if image.body is not None else image.path
+
+
+def _image_width(source: bytes | str) -> int:
+    from PIL import Image  # pylint: disable=import-outside-toplevel
+
+    # Opening only reads the header
+    with Image.open(BytesIO(source) if isinstance(source, bytes) else source) as img:
+        return img.width
+
+
+def _render_placeholder(width: int, height: int, image_format: str) -> bytes:
+    # Pillow is only needed here and is slow to import, so defer it
+    from PIL import Image  # pylint: disable=import-outside-toplevel
+
+    return _encode(Image.new(mode="RGBA", size=(width, height)), image_format)
+
+
+def _render_variant(source: bytes | str, width: int | None, image_format: str) -> bytes:
+    """Resize and re-encode an image body, or the image file at path source."""
+    from PIL import Image  # pylint: disable=import-outside-toplevel
+
+    with Image.open(BytesIO(source) if isinstance(source, bytes) else source) as img:
+        img.load()
+        if width is not None and img.width > width:
+            height = max(1, round(img.height * width / img.width))
+            return _encode(
+                img.resize((width, height), Image.Resampling.LANCZOS), image_format
+            )
+        return _encode(img, image_format)
+
+
+def _encode(img, image_format: str) -> bytes:
+    from PIL import Image  # pylint: disable=import-outside-toplevel
+
+    pil_format = IMAGE_FORMATS[image_format][0]
+    if pil_format == "JPEG":
+        # No alpha channel in JPEG, flatten transparent artwork onto white
+        img = img.convert("RGBA")
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        background.paste(img, mask=img.getchannel("A"))
+        img = background
+
+    stream = BytesIO()
+    if pil_format == "PNG":
+        img.save(stream, pil_format, optimize=True)
+    else:
+        img.save(stream, pil_format, quality=85)
+    return stream.getvalue()
@@ -0,0 +1,173 @@
+"""Lightweight instrumentation for the Keurig Connect integration.
+
+Everything here is a handful of counter increments per call, so it is always
+on. The numbers are exposed through diagnostics and the diagnostic sensors.
+"""
+from __future__ import annotations
+
+import asyncio
+from bisect import bisect_left
+from collections import Counter
+import time
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import DATA_METRICS
+
+# Upper bounds of the latency buckets, in milliseconds
+LATENCY_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+class Histogram:
+    """A fixed bucket latency histogram."""
+
+    __slots__ = ("counts", "count", "total")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, milliseconds: float) -> None:
+        self.counts[bisect_left(LATENCY_BUCKETS, milliseconds)] += 1
+        self.count += 1
+        self.total += milliseconds
+
+    def percentile(self, fraction: float) -> float | None:
+        """Return the upper bound of the bucket holding the given percentile."""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                break
+        return LATENCY_BUCKETS[index] if index < len(LATENCY_BUCKETS) else None
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count if self.count else None,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "buckets": dict(
+                zip([*map(str, LATENCY_BUCKETS), "inf"], self.counts, strict=True)
+            ),
+        }
+
+
+class OperationStats:
+    __slots__ = ("latency", "errors", "timeouts")
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.errors = 0
+        self.timeouts = 0
+
+
+class _Tracker:
+    __slots__ = ("_stats", "_start")
+
+    def __init__(self, stats: OperationStats):
+        self._stats = stats
+
+    def __enter__(self):
+        self._start = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stats.latency.record((time.monotonic() - self._start) * 1000)
+        if exc_type is not None:
+            if issubclass(exc_type, (asyncio.TimeoutError, TimeoutError)):
+                self._stats.timeouts += 1
+            else:
+                self._stats.errors += 1
+        return False
+
+
+class KeurigMetrics:
+    """Latency, error, push and cache counters for the whole integration."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.operations: dict[str, OperationStats] = {}
+        self.pushes: Counter[str] = Counter()
+        self.last_push: dict[str, float] = {}
+        self.cache: Counter[str] = Counter()
+        self.prefetch: Counter[str] = Counter()
+
+    def track(self, operation: str) -> _Tracker:
+        """Return a context manager timing one call of operation."""
+        if (stats := self.operations.get(operation)) is None:
+            stats = self.operations[operation] = OperationStats()
+        return _Tracker(stats)
+
+    def record_push(self, brewer_id: str) -> None:
+        self.pushes[brewer_id] += 1
+        self.last_push[brewer_id] = time.monotonic()
+
+    def record_cache(self, result: str, prefetch: bool = False) -> None:
+        """Count an image cache lookup, by a client or the prefetcher.
+
+        result is memory, disk, coalesced (joined an in-flight load) or miss.
+        """
+        (self.prefetch if prefetch else self.cache)[result] += 1
+
+    @property
+    def cache_hit_ratio(self) -> float | None:
+        """Return the share of client lookups served without waiting on a load."""
+        total = sum(self.cache.values())
+        if not total:
+            return None
+        return (self.cache["memory"] + self.cache["disk"]) / total
+
+    @property
+    def error_count(self) -> int:
+        return sum(stats.errors + stats.timeouts for stats in self.operations.values())
+
+    def cloud_latency(self, fraction: float) -> float | None:
+        """Return a latency percentile across every cloud operation."""
+        combined = Histogram()
+        for stats in self.operations.values():
+            for index, bucket_count in enumerate(stats.latency.counts):
+                combined.counts[index] += bucket_count
+            combined.count += stats.latency.count
+        return combined.percentile(fraction)
+
+    def as_dict(self) -> dict[str, Any]:
+        now = time.monotonic()
+        uptime = now - self.started
+        return {
+            "uptime_s": uptime,
+            "operations": {
+                name: {
+                    **stats.latency.as_dict(),
+                    "errors": stats.errors,
+                    "timeouts": stats.timeouts,
+                }
+                for name, stats in sorted(self.operations.items())
+            },
+            "push": {
+                brewer_id: {
+                    "count": count,
+                    "per_minute": count * 60 / uptime if uptime else None,
+                    "last_s_ago": now - self.last_push[brewer_id],
+                }
+                for brewer_id, count in self.pushes.items()
+            },
+            "image_cache": {
+                **self.cache,
+                "hit_ratio": self.cache_hit_ratio,
+                "prefetch": dict(self.prefetch),
+            },
+        }
+
+
+@callback
+def get_metrics(hass: HomeAssistant) -> KeurigMetrics:
+    if DATA_METRICS not in hass.data:
+        hass.data[DATA_METRICS] = KeurigMetrics()
+    return hass.data[DATA_METRICS]
@@ -0,0 +1,61 @@
+"""Background prefetch of pod artwork for the Keurig Connect integration."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+import logging
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import PREFETCH_INTERVAL, PREFETCH_MAX_PENDING
+from .image_cache import KeurigImageCache
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class ArtworkPrefetcher:
+    """Fetch pod artwork into the image cache before anyone asks for it.
+
+    Requests are deduplicated and skipped when the image is already cached.
+    Fetches run one at a time, PREFETCH_INTERVAL apart, so prefetching never
+    competes with a dashboard for the cloud.
+    """
+
+    def __init__(self, hass: HomeAssistant, image_cache: KeurigImageCache):
+        self._hass = hass
+        self._image_cache = image_cache
+        self._pending: dict[tuple[str, str], Callable[[str], Awaitable[bytes]]] = {}
+        self._task: asyncio.Task | None = None
+
+    @callback
+    def async_schedule(
+        self, kind: str, image_id, fetch: Callable[[str], Awaitable[bytes]]
+    ) -> bool:
+        """Queue a prefetch, returning False if too many are already pending."""
+        key = (kind, str(image_id))
+        if key in self._pending:
+            return True
+        if len(self._pending) >= PREFETCH_MAX_PENDING:
+            return False
+        self._pending[key] = fetch
+        if self._task is None or self._task.done():
+            self._task = self._hass.async_create_background_task(
+                self._async_run(), "keurig artwork prefetch"
+            )
+        return True
+
+    async def _async_run(self) -> None:
+        while self._pending:
+            (kind, image_id), fetch = next(iter(self._pending.items()))
+            try:
+                if await self._image_cache.async_contains(kind, image_id):
+                    continue
+                _LOGGER.debug("Prefetching %s image %s", kind, image_id)
+                await self._image_cache.async_get(
+                    kind, image_id, fetch, prefetch=True
+                )
+                await asyncio.sleep(PREFETCH_INTERVAL)
+            except Exception as err:  # pylint: disable=broad-except
+                _LOGGER.debug("Unable to prefetch %s image %s: %s", kind, image_id, err)
+            finally:
+                self._pending.pop((kind, image_id), None)
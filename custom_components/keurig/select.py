@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from homeassistant.components.select import SelectEntity
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.restore_state import RestoreEntity
+
+from .const import ATTR_FAVORITE_ID, DOMAIN
+from .coordinator import KeurigCoordinator
+from .entity import KeurigEntity
+
+
+async def async_setup_entry(hass: HomeAssistant, config, add_entities):
+    coordinator: KeurigCoordinator = hass.data[DOMAIN][config.entry_id]
+
+    entities = []
+    for brewer in coordinator.devices:
+        entities.append(KeurigFavoriteSelectEntity(brewer, coordinator))
+
+    add_entities(entities)
+
+
+class KeurigFavoriteSelectEntity(KeurigEntity, SelectEntity, RestoreEntity):
+    """The brewer's favorites, the selected one being brewed by brew_favorite
+    when no favorite is given."""
+
+    def __init__(self, device, coordinator):
+        self._catalog = coordinator.get_favorites(device)
+
+        self._attr_name = "Favorite"
+        self._attr_unique_id = device.id + "_favorite"
+        self._attr_icon = "mdi:coffee"
+
+        super().__init__(device, coordinator)
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        if (last_state := await self.async_get_last_state()) is not None:
+            self._catalog.selected_id = last_state.attributes.get(ATTR_FAVORITE_ID)
+        self.async_on_remove(
+            self._catalog.async_add_listener(self._async_catalog_changed)
+        )
+
+    def _update_attrs(self) -> None:
+        # Names repeat across favorites surprisingly often, list each once
+        self._attr_options = list(
+            dict.fromkeys(favorite.name for favorite in self._catalog.favorites)
+        )
+        selected = self._catalog.selected
+        self._attr_current_option = None if selected is None else selected.name
+        self._attr_extra_state_attributes = {
+            ATTR_FAVORITE_ID: self._catalog.selected_id
+        }
+
+    @callback
+    def _async_catalog_changed(self) -> None:
+        # Options aren't part of the change check, so always write
+        self._update_attrs()
+        self.async_write_ha_state()
+
+    async def async_select_option(self, option: str) -> None:
+        if (favorite := self._catalog.async_find(option)) is not None:
+            self._catalog.selected_id = favorite.id
+        self._async_catalog_changed()
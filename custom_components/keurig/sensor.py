@@ -1,8 +1,15 @@
-from homeassistant.exceptions import ConfigEntryNotReady
-from homeassistant.helpers.entity import DeviceInfo
+from __future__ import annotations
+
+from collections.abc import Callable
+from functools import partial
+
+from homeassistant.const import PERCENTAGE, UnitOfTime
+from homeassistant.helpers.entity import Entity, EntityCategory
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
-from . import KeurigCoordinator
-from homeassistant.core import HomeAssistant, callback
+from .breaker import BREAKER_STATES
+from .coordinator import KeurigCoordinator
 from .const import (
     ATTR_POD_BRAND,
     ATTR_POD_IS_FLAVORED,
@@ -11,24 +18,23 @@ from .const import (
     ATTR_POD_IS_TEA,
     ATTR_POD_ROAST_TYPE,
     ATTR_POD_VARIETY,
+    DATA_SHARED_SENSORS,
     DOMAIN,
-    MANUFACTURER,
 )
-from homeassistant.components.sensor import SensorEntity
+from .entity import KeurigEntity
+from .views import image_url
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorStateClass,
+)
 
 
 async def async_setup_entry(hass: HomeAssistant, config, add_entities):
     coordinator: KeurigCoordinator = hass.data[DOMAIN][config.entry_id]
 
-    devices = None
-    try:
-        devices = await coordinator.get_devices()
-    except Exception as ex:
-        raise ConfigEntryNotReady("Failed to retrieve Keurig devices") from ex
-
     entities = []
-    for brewer in devices:
-        await brewer.async_update()
+    for brewer in coordinator.devices:
         entities.append(
             KeurigSensorEntity(
                 hass=hass,
@@ -47,55 +53,107 @@ async def async_setup_entry(hass: HomeAssistant, config, add_entities):
                 device_type="brewer_status",
             )
         )
+        entities.append(KeurigQueueSensorEntity(brewer, coordinator))
 
     add_entities(entities)
 
+    # The metrics are integration wide and the breaker belongs to the account,
+    # so only one entry provides each of them
+    _async_add_shared(hass, "metrics", coordinator, add_entities, _metric_sensors)
+    _async_add_shared(
+        hass,
+        f"breaker_{coordinator.session.username.lower()}",
+        coordinator,
+        add_entities,
+        lambda coordinator: [KeurigBreakerSensorEntity(coordinator)],
+    )
+
+
+def _metric_sensors(coordinator: KeurigCoordinator) -> list[Entity]:
+    return [
+        KeurigDiagnosticSensorEntity(
+            coordinator, "Cloud Latency", "cloud_latency", UnitOfTime.MILLISECONDS
+        ),
+        KeurigDiagnosticSensorEntity(coordinator, "Cloud Errors", "cloud_errors", None),
+        KeurigDiagnosticSensorEntity(
+            coordinator, "Image Cache Hit Ratio", "image_cache_hit_ratio", PERCENTAGE
+        ),
+    ]
+
+
+@callback
+def _async_add_shared(
+    hass: HomeAssistant,
+    key: str,
+    coordinator: KeurigCoordinator,
+    add_entities: AddEntitiesCallback,
+    create: Callable[[KeurigCoordinator], list[Entity]],
+) -> None:
+    """Offer entry as a provider of the entities shared under key."""
+    shared: dict[str, _SharedSensors] = hass.data.setdefault(DATA_SHARED_SENSORS, {})
+    if key not in shared:
+        shared[key] = _SharedSensors(create, partial(shared.pop, key))
+    coordinator.entry.async_on_unload(
+        shared[key].async_add_provider(coordinator, add_entities)
+    )
+
+
+class _SharedSensors:
+    """Entities shared by several config entries, added through only one.
+
+    The first entry to set up provides them. When it unloads they are added
+    again through another loaded entry, keeping their unique ids.
+    """
+
+    def __init__(
+        self,
+        create: Callable[[KeurigCoordinator], list[Entity]],
+        on_empty: Callable[[], object],
+    ):
+        self._create = create
+        self._on_empty = on_empty
+        self._providers: dict[str, tuple[KeurigCoordinator, AddEntitiesCallback]] = {}
+        self._owner: str | None = None
+
+    @callback
+    def async_add_provider(
+        self, coordinator: KeurigCoordinator, add_entities: AddEntitiesCallback
+    ) -> CALLBACK_TYPE:
+        entry_id = coordinator.entry.entry_id
+        self._providers[entry_id] = (coordinator, add_entities)
+        if self._owner is None:
+            self._async_add_entities()
+        return partial(self._async_remove_provider, entry_id)
+
+    @callback
+    def _async_remove_provider(self, entry_id: str) -> None:
+        # Runs once the entry's platforms, and so its entities, are unloaded
+        self._providers.pop(entry_id, None)
+        if not self._providers:
+            self._on_empty()
+        elif self._owner == entry_id:
+            self._async_add_entities()
+
+    @callback
+    def _async_add_entities(self) -> None:
+        self._owner, (coordinator, add_entities) = next(iter(self._providers.items()))
+        add_entities(self._create(coordinator))
 
-class KeurigSensorEntity(SensorEntity, CoordinatorEntity):
+
+class KeurigSensorEntity(KeurigEntity, SensorEntity):
     def __init__(self, hass, name, device, coordinator, device_type):
         self._hass = hass
-        self._device = device
-        self._coordinator = coordinator
         self._device_type = device_type
 
         self._attr_name = name
         # self._attr_device_class = device_class
-        self._attr_has_entity_name = True
 
         self._attr_unique_id = device.id + "_" + device_type
         self._attr_icon = "mdi:coffee-maker"
 
-        if self._device_type == "pod_status":
-            self._attr_native_value = self.__pod_status_string(self._device.pod_status)
-            self._attr_extra_state_attributes = {
-                ATTR_POD_BRAND: self._device.pod_brand,
-                ATTR_POD_VARIETY: self._device.pod_variety,
-                ATTR_POD_ROAST_TYPE: self._device.pod_roast_type,
-                ATTR_POD_IS_TEA: self._device.pod_is_tea,
-                ATTR_POD_IS_ICED: self._device.pod_is_iced,
-                ATTR_POD_IS_FLAVORED: self._device.pod_is_flavored,
-                ATTR_POD_IS_POWDERED: self._device.pod_is_powdered,
-            }
-        elif self._device_type == "brewer_status":
-            self._attr_native_value = self.__brewer_status_string(
-                self._device.brewer_status, self._device.errors
-            )
+        super().__init__(device, coordinator)
 
-        self._attr_device_info = DeviceInfo(
-            identifiers={(DOMAIN, device.id)},
-            manufacturer=MANUFACTURER,
-            name=device.name,
-            model=device.model,
-            sw_version=device.sw_version,
-        )
-
-        super().__init__(coordinator)
-
-    async def async_added_to_hass(self) -> None:
-        self.async_on_remove(self._device.register_callback(self._update_data))
-
-    @callback
-    def _update_data(self, args):
+    def _update_attrs(self) -> None:
         if self._device_type == "pod_status":
             self._attr_native_value = self.__pod_status_string(self._device.pod_status)
             self._attr_extra_state_attributes = {
@@ -107,11 +165,14 @@ class KeurigSensorEntity(SensorEntity, CoordinatorEntity):
                 ATTR_POD_IS_FLAVORED: self._device.pod_is_flavored,
                 ATTR_POD_IS_POWDERED: self._device.pod_is_powdered,
             }
+            variety_id = self._device.pod_variety_id
+            self._attr_entity_picture = (
+                None if variety_id is None else image_url("variety", variety_id)
+            )
         elif self._device_type == "brewer_status":
             self._attr_native_value = self.__brewer_status_string(
                 self._device.brewer_status, self._device.errors
             )
-        self.schedule_update_ha_state(False)
 
     def __pod_status_string(self, value: str):
         if value == "EMPTY":
@@ -145,3 +206,91 @@ class KeurigSensorEntity(SensorEntity, CoordinatorEntity):
             return "complete"
         else:
             return value
+
+
+class KeurigQueueSensorEntity(KeurigEntity, SensorEntity):
+    """Number of brew commands waiting for the brewer to be ready."""
+
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_icon = "mdi:tray-full"
+
+    def __init__(self, device, coordinator):
+        self._queue = coordinator.get_command_queue(device)
+        self._attr_name = "Queued Brews"
+        self._attr_unique_id = device.id + "_queue_depth"
+        super().__init__(device, coordinator)
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self._queue.async_add_listener(self._async_write_if_changed)
+        )
+
+    def _update_attrs(self) -> None:
+        self._attr_native_value = len(self._queue)
+
+
+class KeurigDiagnosticSensorEntity(CoordinatorEntity[KeurigCoordinator], SensorEntity):
+    """Integration wide instrumentation, refreshed with the coordinator."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_icon = "mdi:chart-line"
+
+    def __init__(self, coordinator, name, sensor_type, unit):
+        super().__init__(coordinator)
+        self._sensor_type = sensor_type
+        self._attr_name = f"Keurig {name}"
+        self._attr_unique_id = f"{DOMAIN}_{sensor_type}"
+        self._attr_native_unit_of_measurement = unit
+
+    @property
+    def native_value(self):
+        metrics = self.coordinator.metrics
+        if self._sensor_type == "cloud_latency":
+            return metrics.cloud_latency(0.95)
+        elif self._sensor_type == "cloud_errors":
+            return metrics.error_count
+        elif self._sensor_type == "image_cache_hit_ratio":
+            ratio = metrics.cache_hit_ratio
+            return None if ratio is None else round(ratio * 100, 1)
+
+
+class KeurigBreakerSensorEntity(CoordinatorEntity[KeurigCoordinator], SensorEntity):
+    """State of the circuit breaker guarding the account's cloud calls."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_device_class = SensorDeviceClass.ENUM
+    _attr_options = BREAKER_STATES
+    _attr_icon = "mdi:electric-switch"
+
+    def __init__(self, coordinator):
+        super().__init__(coordinator)
+        self._attr_name = "Keurig Cloud Circuit"
+        self._attr_unique_id = (
+            f"{DOMAIN}_{coordinator.session.username.lower()}_cloud_circuit"
+        )
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.coordinator.session.breaker.async_add_listener(
+                self.async_write_ha_state
+            )
+        )
+
+    @property
+    def available(self) -> bool:
+        # Most interesting exactly when the coordinator is failing
+        return True
+
+    @property
+    def native_value(self):
+        return self.coordinator.session.breaker.state
+
+    @property
+    def extra_state_attributes(self):
+        breaker = self.coordinator.session.breaker.as_dict()
+        del breaker["state"]
+        return breaker
@@ -0,0 +1,355 @@
+"""Services for the Keurig Connect integration."""
+from __future__ import annotations
+
+import asyncio
+import logging
+
+from homeassistant.const import (
+    ATTR_AREA_ID,
+    ATTR_DEVICE_ID,
+    ATTR_ENTITY_ID,
+    ATTR_ID,
+    ATTR_NAME,
+    ATTR_TEMPERATURE,
+)
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.exceptions import HomeAssistantError
+
+from .brew_watcher import OUTCOME_QUEUED, OUTCOME_SENT, BrewWatcher
+from .const import (
+    ATTR_INTENSITY,
+    ATTR_SIZE,
+    ATTR_WAIT,
+    BREW_WAIT_TIMEOUT,
+    CONF_CALL_TIMEOUT,
+    CONF_MAX_PARALLEL_CALLS,
+    DEFAULT_CALL_TIMEOUT,
+    DEFAULT_MAX_PARALLEL_CALLS,
+    DOMAIN,
+    SERVICE_ADD_FAVORITE,
+    SERVICE_BREW_FAVORITE,
+    SERVICE_BREW_HOT,
+    SERVICE_BREW_HOT_WATER,
+    SERVICE_BREW_ICED,
+    SERVICE_BREW_RECOMMENDATION,
+    SERVICE_CANCEL_BREW,
+    SERVICE_DELETE_FAVORITE,
+    SERVICE_UPDATE_FAVORITE,
+)
+from .coordinator import KeurigCoordinator
+from .favorites import Favorite, FavoritesCatalog
+from .helpers import get_brewers_for_service, get_coordinator_for_brewer
+from .metrics import get_metrics
+
+_LOGGER = logging.getLogger(__name__)
+
+
+async def async_call_brewers(
+    hass: HomeAssistant,
+    call: ServiceCall,
+    action,
+    queued: bool = False,
+    prepare=None,
+) -> ServiceResponse:
+    """Run action against every targeted brewer concurrently.
+
+    Each brewer is routed to the coordinator of the config entry that loaded it
+    and concurrency is limited per entry using that entry's options. Queued
+    actions go through the brewer's command queue. They return once sent, or
+    once queued if the brewer isn't ready, unless the call asks to wait, in
+    which case they return once the brew has finished.
+
+    action runs as a single cloud call, so it must not make cloud calls of its
+    own. prepare, if given, is called with each brewer before anything is sent
+    or queued and returns extra arguments for action.
+    """
+    matched_devices = get_brewers_for_service(
+        hass,
+        call.data.get(ATTR_AREA_ID),
+        call.data.get(ATTR_DEVICE_ID),
+        call.data.get(ATTR_ENTITY_ID),
+    )
+    semaphores: dict[str, asyncio.Semaphore] = {}
+    metrics = get_metrics(hass)
+    wait = queued and call.data.get(ATTR_WAIT, False)
+
+    async def call_brewer(device_id):
+        coordinator: KeurigCoordinator | None = get_coordinator_for_brewer(
+            hass, device_id
+        )
+        if (
+            coordinator is None
+            or (device := await coordinator.async_get_device(device_id)) is None
+        ):
+            raise HomeAssistantError(f"Brewer {device_id} is not loaded")
+
+        entry = coordinator.entry
+        if (semaphore := semaphores.get(entry.entry_id)) is None:
+            semaphore = semaphores[entry.entry_id] = asyncio.Semaphore(
+                entry.options.get(CONF_MAX_PARALLEL_CALLS, DEFAULT_MAX_PARALLEL_CALLS)
+            )
+        timeout = entry.options.get(CONF_CALL_TIMEOUT, DEFAULT_CALL_TIMEOUT)
+        args = () if prepare is None else prepare(device)
+
+        watcher: BrewWatcher | None = None
+
+        async def send():
+            nonlocal watcher
+            async with semaphore:
+                if wait:
+                    # Listen before sending so no status update is missed
+                    watcher = BrewWatcher(coordinator, device)
+                with metrics.track(f"service_{call.service}"):
+                    await coordinator.session.async_call(
+                        action, device, *args, timeout=timeout
+                    )
+            if watcher is not None:
+                watcher.mark_sent()
+
+        try:
+            if queued:
+                queue = coordinator.get_command_queue(device)
+                if not await queue.async_submit(send, wait=wait):
+                    return {"outcome": OUTCOME_QUEUED}
+            else:
+                await send()
+            if watcher is None:
+                return {"outcome": OUTCOME_SENT}
+            return await watcher.async_wait(BREW_WAIT_TIMEOUT)
+        finally:
+            if watcher is not None:
+                watcher.async_cancel()
+
+    results = await asyncio.gather(
+        *(call_brewer(device_id) for device_id in matched_devices),
+        return_exceptions=True,
+    )
+    failures = {
+        device_id: result
+        for device_id, result in zip(matched_devices, results)
+        if isinstance(result, Exception)
+    }
+    if failures:
+        for device_id, err in failures.items():
+            _LOGGER.debug("%s failed on %s: %r", call.service, device_id, err)
+        raise HomeAssistantError(
+            f"{call.service} failed on {len(failures)} of {len(matched_devices)} "
+            "brewers: "
+            + ", ".join(
+                f"{device_id} ({type(err).__name__})"
+                for device_id, err in failures.items()
+            )
+        )
+    if call.return_response:
+        return {"brewers": dict(zip(matched_devices, results))}
+    return None
+
+
+def _sized(hass: HomeAssistant, size, action):
+    """Wrap a brew action so the brew history learns the cup size."""
+
+    async def brew(device):
+        await action(device)
+        get_coordinator_for_brewer(hass, device.id).note_brew_size(device.id, int(size))
+
+    return brew
+
+
+def _get_favorites(hass: HomeAssistant, device) -> FavoritesCatalog:
+    return get_coordinator_for_brewer(hass, device.id).get_favorites(device)
+
+
+@callback
+def _resolve_favorite(hass: HomeAssistant, device, favorite_id, name) -> str:
+    """Return the id of the favorite to brew, looking names up locally.
+
+    Without an id or a name the favorite chosen in the brewer's select is used.
+    """
+    if favorite_id is not None:
+        return favorite_id
+    catalog = _get_favorites(hass, device)
+    if name is not None:
+        if (favorite := catalog.async_find(name)) is None:
+            raise HomeAssistantError(f"{device.name} has no favorite named {name}")
+    elif (favorite := catalog.selected) is None:
+        raise HomeAssistantError(f"No favorite is selected for {device.name}")
+    return favorite.id
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the Keurig services once for all config entries."""
+
+    async def handle_brew_hot_water(call: ServiceCall) -> ServiceResponse:
+        size = call.data.get(ATTR_SIZE)
+        temperature = call.data.get(ATTR_TEMPERATURE)
+        return await async_call_brewers(
+            hass,
+            call,
+            _sized(
+                hass,
+                size,
+                lambda device: device.hot_water(int(size), int(temperature)),
+            ),
+            queued=True,
+        )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_BREW_HOT_WATER,
+        handle_brew_hot_water,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+    async def handle_brew_hot(call: ServiceCall) -> ServiceResponse:
+        size = call.data.get(ATTR_SIZE)
+        temperature = call.data.get(ATTR_TEMPERATURE)
+        intensity = call.data.get(ATTR_INTENSITY)
+        return await async_call_brewers(
+            hass,
+            call,
+            _sized(
+                hass,
+                size,
+                lambda device: device.brew_hot(
+                    int(size), int(temperature), int(intensity)
+                ),
+            ),
+            queued=True,
+        )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_BREW_HOT,
+        handle_brew_hot,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+    async def handle_brew_iced(call: ServiceCall) -> ServiceResponse:
+        return await async_call_brewers(
+            hass, call, lambda device: device.brew_iced(), queued=True
+        )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_BREW_ICED,
+        handle_brew_iced,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+    async def handle_brew_recommendation(call: ServiceCall) -> ServiceResponse:
+        size = call.data.get(ATTR_SIZE)
+        return await async_call_brewers(
+            hass,
+            call,
+            _sized(hass, size, lambda device: device.brew_recommendation(int(size))),
+            queued=True,
+        )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_BREW_RECOMMENDATION,
+        handle_brew_recommendation,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+    async def handle_brew_favorite(call: ServiceCall) -> ServiceResponse:
+        favorite_id = call.data.get(ATTR_ID)
+        name = call.data.get(ATTR_NAME)
+
+        async def brew(device, resolved_id):
+            await device.brew_favorite(resolved_id)
+            if (
+                favorite := _get_favorites(hass, device).async_get(resolved_id)
+            ) is not None:
+                get_coordinator_for_brewer(hass, device.id).note_brew_size(
+                    device.id, favorite.size
+                )
+
+        return await async_call_brewers(
+            hass,
+            call,
+            brew,
+            queued=True,
+            prepare=lambda device: (
+                _resolve_favorite(hass, device, favorite_id, name),
+            ),
+        )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_BREW_FAVORITE,
+        handle_brew_favorite,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+    async def handle_cancel_brew(call: ServiceCall):
+        await async_call_brewers(hass, call, lambda device: device.cancel_brew())
+
+    hass.services.async_register(DOMAIN, SERVICE_CANCEL_BREW, handle_cancel_brew)
+
+    async def handle_add_favorite(call: ServiceCall):
+        name = call.data.get(ATTR_NAME)
+        size = call.data.get(ATTR_SIZE)
+        temperature = call.data.get(ATTR_TEMPERATURE)
+        intensity = call.data.get(ATTR_INTENSITY)
+
+        async def add(device):
+            await device.add_favorite(
+                name, int(size), int(temperature), int(intensity)
+            )
+            # pykeurig doesn't return the new favorite's id and can't list
+            # favorites, so it can only be catalogued once its id is known
+            _LOGGER.warning(
+                "Added favorite %s to %s, its id isn't known so it can't be "
+                "selected or brewed by name until update_favorite is called "
+                "with its id",
+                name,
+                device.name,
+            )
+
+        await async_call_brewers(hass, call, add)
+
+    hass.services.async_register(DOMAIN, SERVICE_ADD_FAVORITE, handle_add_favorite)
+
+    async def handle_update_favorite(call: ServiceCall):
+        favorite_id = call.data.get(ATTR_ID)
+        name = call.data.get(ATTR_NAME)
+        size = call.data.get(ATTR_SIZE)
+        temperature = call.data.get(ATTR_TEMPERATURE)
+        intensity = call.data.get(ATTR_INTENSITY)
+
+        async def update(device):
+            await device.update_favorite(
+                favorite_id, name, int(size), int(temperature), int(intensity)
+            )
+            _get_favorites(hass, device).async_set(
+                Favorite(
+                    str(favorite_id), name, int(size), int(temperature), int(intensity)
+                )
+            )
+
+        await async_call_brewers(hass, call, update)
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_UPDATE_FAVORITE, handle_update_favorite
+    )
+
+    async def handle_delete_favorite(call: ServiceCall):
+        favorite_id = call.data.get(ATTR_ID)
+
+        async def delete(device):
+            await device.delete_favorite(favorite_id)
+            _get_favorites(hass, device).async_remove(favorite_id)
+
+        await async_call_brewers(hass, call, delete)
+
+    hass.services.async_register(
+        DOMAIN, SERVICE_DELETE_FAVORITE, handle_delete_favorite
+    )
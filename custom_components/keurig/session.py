@@ -0,0 +1,382 @@
+"""Shared Keurig cloud sessions for the Keurig Connect integration."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from functools import partial
+import logging
+import random
+import time
+from typing import Any, TypeVar
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import (
+    CONF_PASSWORD,
+    CONF_USERNAME,
+    EVENT_HOMEASSISTANT_STOP,
+)
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+from homeassistant.exceptions import ConfigEntryAuthFailed
+from httpx import HTTPStatusError
+from pykeurig.keurigapi import KeurigApi, UnauthorizedException
+
+from .breaker import CircuitBreaker
+from .const import (
+    BREAKER_FAILURE_THRESHOLD,
+    BREAKER_RESET_TIMEOUT,
+    DATA_SESSIONS,
+    PUSH_STALE_AFTER,
+    RECONNECT_MAX_DELAY,
+    RECONNECT_MIN_DELAY,
+)
+from .metrics import get_metrics
+from .tokens import export_tokens, get_token_store, restore_tokens
+
+_LOGGER = logging.getLogger(__name__)
+
+_T = TypeVar("_T")
+
+
+class KeurigSession:
+    """A logged in KeurigApi and its push connection, shared by every config
+    entry that uses the same account."""
+
+    def __init__(self, hass: HomeAssistant, username: str, password: str):
+        self.hass = hass
+        self.api = KeurigApi()
+        self.entry_ids: set[str] = set()
+        self.username = username
+        self._password = password
+        self._lock = asyncio.Lock()
+        self._metrics = get_metrics(hass)
+        self.breaker = CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_TIMEOUT)
+        self._token_store = get_token_store(hass)
+        self._logged_in = False
+        # Bumped on every login so callers can tell whether the tokens they
+        # were rejected with have already been replaced
+        self._auth_generation = 0
+        self._auth_task: asyncio.Task | None = None
+        self._connected = False
+        self._devices = None
+        self._reconnect_task: asyncio.Task | None = None
+        self._reconnect_attempts = 0
+        self._push_listeners: dict[str, list[Callable[[], None]]] = {}
+        self._push_unsubs: dict[str, Callable[[], None]] = {}
+        self.last_push = 0.0
+        # Entries aren't unloaded on shutdown, so save the latest tokens here
+        self._unsub_stop: CALLBACK_TYPE | None = hass.bus.async_listen_once(
+            EVENT_HOMEASSISTANT_STOP, self._async_on_stop
+        )
+
+    @property
+    def push_connected(self) -> bool:
+        """Return True while the push connection is up and not being replaced."""
+        return self._connected and (
+            self._reconnect_task is None or self._reconnect_task.done()
+        )
+
+    @callback
+    def async_check_push(self) -> None:
+        """Reconnect right away if pykeurig's push connection has closed."""
+        if self.push_connected and _push_hub_closed(self.api):
+            _LOGGER.debug("Keurig push connection closed, reconnecting")
+            self.async_schedule_reconnect()
+
+    @property
+    def push_stale(self) -> bool:
+        """Return True when nothing has been pushed for a suspiciously long time."""
+        return time.monotonic() - self.last_push > PUSH_STALE_AFTER
+
+    @callback
+    def async_add_push_listener(
+        self, brewer_id: str, listener: Callable[[], None]
+    ) -> CALLBACK_TYPE:
+        """Call listener on the event loop whenever brewer_id pushes an update.
+
+        The brewer's pykeurig callback is only registered while something
+        listens, so brewers no loaded entry selected are never subscribed.
+        """
+        if (listeners := self._push_listeners.get(brewer_id)) is None:
+            device = next(device for device in self._devices if device.id == brewer_id)
+            listeners = self._push_listeners[brewer_id] = []
+            self._push_unsubs[brewer_id] = device.register_callback(
+                partial(self._on_push, brewer_id)
+            )
+        listeners.append(listener)
+
+        @callback
+        def remove_listener() -> None:
+            listeners.remove(listener)
+            if not listeners and self._push_listeners.get(brewer_id) is listeners:
+                del self._push_listeners[brewer_id]
+                self._push_unsubs.pop(brewer_id)()
+
+        return remove_listener
+
+    def _on_push(self, brewer_id: str, args) -> None:
+        # pykeurig pushes from a thread of its own, this is the only hop to the
+        # loop per push however many entities listen
+        self.hass.loop.call_soon_threadsafe(self._async_dispatch_push, brewer_id)
+
+    @callback
+    def _async_dispatch_push(self, brewer_id: str) -> None:
+        self.last_push = time.monotonic()
+        self._metrics.record_push(brewer_id)
+        for listener in list(self._push_listeners.get(brewer_id, ())):
+            listener()
+
+    def mark_push_alive(self) -> None:
+        self.last_push = time.monotonic()
+
+    async def async_login(self) -> None:
+        """Log in, preferring tokens stored by a previous run."""
+        async with self._lock:
+            if self._logged_in:
+                return
+            tokens = await self._token_store.async_get(self.username)
+            if tokens is not None and restore_tokens(self.api, tokens):
+                _LOGGER.debug("Reusing stored Keurig tokens for %s", self.username)
+            else:
+                await self._async_full_login()
+            self._logged_in = True
+
+    async def _async_full_login(self) -> None:
+        with self._metrics.track("login"):
+            if not await self._async_attempt(
+                self.api.login, (self.username, self._password), None
+            ):
+                await self._token_store.async_set(self.username, None)
+                raise ConfigEntryAuthFailed("Invalid Keurig credentials")
+        self._auth_generation += 1
+        await self.async_save_tokens()
+
+    async def async_call(
+        self,
+        func: Callable[..., Awaitable[_T]],
+        *args: Any,
+        timeout: float | None = None,
+    ) -> _T:
+        """Await func(*args), retrying once after a silent login if the cloud
+        rejects the session's tokens.
+
+        timeout bounds the whole call, retry included. Raises CircuitOpenError
+        without calling func while the cloud is known to be down, and
+        ConfigEntryAuthFailed, having started reauth for every entry using the
+        account, when the stored credentials no longer work.
+        """
+        deadline = None if timeout is None else self.hass.loop.time() + timeout
+        generation = self._auth_generation
+        try:
+            result = await self._async_attempt(func, args, deadline)
+        except UnauthorizedException:
+            await self._async_relogin(generation)
+            result = await self._async_attempt(func, args, deadline)
+        # pykeurig refreshes expired tokens inside any call, unchanged tokens
+        # aren't written again
+        await self.async_save_tokens()
+        return result
+
+    async def _async_attempt(self, func, args, deadline: float | None):
+        """Make one call through the circuit breaker."""
+        self.breaker.before_call()
+        try:
+            if deadline is None:
+                result = await func(*args)
+            else:
+                result = await asyncio.wait_for(
+                    func(*args), max(0, deadline - self.hass.loop.time())
+                )
+        except UnauthorizedException:
+            # The cloud answered, it just didn't like the tokens
+            self.breaker.record_success()
+            raise
+        except HTTPStatusError as err:
+            if err.response.status_code >= 500:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            self.breaker.record_abort()
+            raise
+        self.breaker.record_success()
+        return result
+
+    async def _async_relogin(self, generation: int) -> None:
+        """Log in again once for every caller rejected with the same tokens."""
+        if generation != self._auth_generation:
+            # Someone else logged in since this call was sent
+            return
+        if self._auth_task is None:
+            self._auth_task = self.hass.async_create_task(
+                self._async_run_relogin(), "keurig relogin"
+            )
+        await asyncio.shield(self._auth_task)
+
+    async def _async_run_relogin(self) -> None:
+        _LOGGER.debug("Keurig tokens were rejected, logging in again")
+        try:
+            await self._async_full_login()
+        except ConfigEntryAuthFailed:
+            for entry_id in self.entry_ids:
+                if entry := self.hass.config_entries.async_get_entry(entry_id):
+                    entry.async_start_reauth(self.hass)
+            raise
+        finally:
+            self._auth_task = None
+
+    async def async_save_tokens(self) -> None:
+        """Persist the api's tokens, which pykeurig refreshes as they expire."""
+        if (tokens := export_tokens(self.api)) is not None:
+            await self._token_store.async_set(self.username, tokens)
+
+    async def _async_on_stop(self, event: Event) -> None:
+        self._unsub_stop = None
+        await self.async_save_tokens()
+
+    async def async_get_devices(self):
+        """Return the account's brewers, fetched once for all entries so that
+        push updates reach the same device objects everywhere."""
+        async with self._lock:
+            if self._devices is None:
+                with self._metrics.track("get_devices"):
+                    self._devices = await self.async_call(self.api.async_get_devices)
+        return self._devices
+
+    async def async_connect(self) -> bool:
+        """Open the push connection, scheduling retries if that fails."""
+        if self._reconnect_task is not None and not self._reconnect_task.done():
+            return False
+        async with self._lock:
+            if self._connected:
+                return True
+            try:
+                with self._metrics.track("connect"):
+                    await self._async_open_push()
+            except Exception as err:  # pylint: disable=broad-except
+                _LOGGER.warning("Unable to connect to Keurig push updates: %s", err)
+                self.async_schedule_reconnect()
+                return False
+            self._connected = True
+            self._reconnect_attempts = 0
+            self.mark_push_alive()
+            return True
+
+    def async_schedule_reconnect(self) -> None:
+        """Drop the push connection and reconnect with backoff and jitter."""
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = self.hass.async_create_background_task(
+                self._async_reconnect(), "keurig push reconnect"
+            )
+
+    async def _async_reconnect(self) -> None:
+        if self._connected:
+            self._connected = False
+            await self._async_close_push()
+        while not self._connected:
+            delay = min(
+                RECONNECT_MAX_DELAY, RECONNECT_MIN_DELAY * 2**self._reconnect_attempts
+            )
+            self._reconnect_attempts += 1
+            # Equal jitter, so sessions that dropped together don't retry together
+            await asyncio.sleep(delay / 2 + random.uniform(0, delay / 2))
+            async with self._lock:
+                try:
+                    with self._metrics.track("connect"):
+                        await self._async_open_push()
+                except Exception as err:  # pylint: disable=broad-except
+                    _LOGGER.debug(
+                        "Keurig push reconnect attempt %s failed: %s",
+                        self._reconnect_attempts,
+                        err,
+                    )
+                    continue
+                self._connected = True
+        _LOGGER.info("Reconnected to Keurig push updates")
+        self._reconnect_attempts = 0
+        self.mark_push_alive()
+
+    async def _async_open_push(self) -> None:
+        await self.hass.async_add_executor_job(self.api.connect)
+
+    async def _async_close_push(self) -> None:
+        await self.hass.async_add_executor_job(self.api.disconnect)
+
+    @callback
+    def async_close(self) -> None:
+        """Save the tokens and close the push connection for good."""
+        if self._unsub_stop is not None:
+            self._unsub_stop()
+            self._unsub_stop = None
+        self.hass.async_create_task(self.async_save_tokens())
+        self.async_disconnect()
+
+    @callback
+    def async_disconnect(self) -> None:
+        if self._reconnect_task is not None:
+            self._reconnect_task.cancel()
+            self._reconnect_task = None
+        if self._connected:
+            self._connected = False
+            self.hass.async_create_task(self._async_close_push())
+
+
+def _push_hub_closed(api: KeurigApi) -> bool:
+    """Return True if pykeurig's SignalR hub connection is known to be closed.
+
+    pykeurig neither exposes its hub nor forwards its close and error events,
+    so find the signalrcore connection among the api's attributes. When there
+    is none, only the coordinator's silence check notices a dead connection.
+    """
+    try:
+        # pylint: disable=import-outside-toplevel
+        from signalrcore.hub.base_hub_connection import BaseHubConnection
+    except ImportError:
+        return False
+    hub = next(
+        (
+            value
+            for value in vars(api).values()
+            if isinstance(value, BaseHubConnection)
+        ),
+        None,
+    )
+    return hub is not None and not hub.transport.is_running()
+
+
+async def async_acquire_session(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> KeurigSession:
+    """Return the session for entry's account, logging in if needed."""
+    sessions: dict[str, KeurigSession] = hass.data.setdefault(DATA_SESSIONS, {})
+    username = entry.data[CONF_USERNAME]
+    key = username.lower()
+
+    if (session := sessions.get(key)) is None:
+        session = sessions[key] = KeurigSession(
+            hass, username, entry.data[CONF_PASSWORD]
+        )
+    session.entry_ids.add(entry.entry_id)
+
+    try:
+        await session.async_login()
+    except Exception:
+        async_release_session(hass, entry)
+        raise
+    return session
+
+
+def async_release_session(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Drop entry's reference, closing the session once nothing uses it."""
+    sessions: dict[str, KeurigSession] = hass.data.get(DATA_SESSIONS, {})
+    key = entry.data[CONF_USERNAME].lower()
+    if (session := sessions.get(key)) is None:
+        return
+    session.entry_ids.discard(entry.entry_id)
+    if not session.entry_ids:
+        _LOGGER.debug("Closing Keurig session for %s", entry.data[CONF_USERNAME])
+        session.async_close()
+        sessions.pop(key)
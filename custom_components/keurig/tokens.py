@@ -0,0 +1,70 @@
+"""Persisted Keurig auth tokens for the Keurig Connect integration."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from pykeurig.keurigapi import KeurigApi
+
+from .const import DATA_TOKEN_STORE, DOMAIN
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.tokens"
+SAVE_DELAY = 10
+
+# pykeurig keeps its session in these attributes and has no public API to
+# export or import it
+_TOKEN_ATTRIBUTES = ("access_token", "refresh_token", "expires_at", "customer_id")
+
+
+def export_tokens(api: KeurigApi) -> dict[str, Any] | None:
+    """Return the api's current tokens, or None when it isn't logged in."""
+    tokens = {attr: getattr(api, f"_{attr}", None) for attr in _TOKEN_ATTRIBUTES}
+    if not tokens["access_token"] or not tokens["refresh_token"]:
+        return None
+    return tokens
+
+
+def restore_tokens(api: KeurigApi, tokens: dict[str, Any]) -> bool:
+    """Load previously exported tokens into a fresh api."""
+    if not tokens.get("access_token") or not tokens.get("refresh_token"):
+        return False
+    for attr in _TOKEN_ATTRIBUTES:
+        setattr(api, f"_{attr}", tokens.get(attr))
+    return True
+
+
+class TokenStore:
+    """Tokens for every account, keyed by lower cased username."""
+
+    def __init__(self, hass: HomeAssistant):
+        self._store = Store(hass, STORAGE_VERSION, STORAGE_KEY, private=True)
+        self._data: dict[str, dict[str, Any]] | None = None
+
+    async def async_load(self) -> None:
+        if self._data is None:
+            self._data = await self._store.async_load() or {}
+
+    async def async_get(self, username: str) -> dict[str, Any] | None:
+        await self.async_load()
+        return self._data.get(username.lower())
+
+    async def async_set(self, username: str, tokens: dict[str, Any] | None) -> None:
+        """Remember tokens for username, None forgetting them."""
+        await self.async_load()
+        key = username.lower()
+        if self._data.get(key) == tokens:
+            return
+        if tokens is None:
+            self._data.pop(key, None)
+        else:
+            self._data[key] = tokens
+        self._store.async_delay_save(lambda: self._data, SAVE_DELAY)
+
+
+@callback
+def get_token_store(hass: HomeAssistant) -> TokenStore:
+    if DATA_TOKEN_STORE not in hass.data:
+        hass.data[DATA_TOKEN_STORE] = TokenStore(hass)
+    return hass.data[DATA_TOKEN_STORE]
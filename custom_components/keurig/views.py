@@ -0,0 +1,265 @@
+"""Image proxy views for the Keurig Connect integration."""
+from __future__ import annotations
+
+import asyncio
+from functools import partial
+from urllib.parse import quote
+
+from aiohttp import hdrs, web
+from httpx import HTTPStatusError
+
+from homeassistant.components.http.view import HomeAssistantView
+
+from .breaker import CircuitOpenError
+from .const import (
+    ATTR_POD_BRAND,
+    ATTR_POD_VARIETY,
+    BREAKER_RESET_TIMEOUT,
+    CONF_IMAGE_TIMEOUT,
+    DEFAULT_IMAGE_TIMEOUT,
+    DOMAIN,
+)
+from .helpers import get_coordinator_for_entity
+from .image_cache import (
+    DEFAULT_IMAGE_FORMAT,
+    IMAGE_FORMATS,
+    CachedImage,
+    KeurigImageCache,
+)
+
+# The image behind an entity URL changes with the pod, so clients must revalidate
+CACHE_CONTROL_ENTITY = "no-cache"
+# The image behind an id URL never changes
+CACHE_CONTROL_IMMUTABLE = "public, max-age=31536000, immutable"
+
+IMAGE_URL = "/api/keurig_image/{kind}/{image_id}"
+# Image kind -> (brewer attribute holding the current id, KeurigApi fetch method)
+IMAGE_KINDS = {
+    "brand": ("pod_brand_id", "async_get_brand_image"),
+    "variety": ("pod_variety_id", "async_get_variety_image"),
+}
+
+BRAND_IMAGE_SIZE = (470, 320)
+VARIETY_IMAGE_SIZE = (2000, 2000)
+# Requested widths are rounded up to one of these so only a few variants of
+# each image are ever rendered and cached, larger requests get the original
+IMAGE_WIDTHS = (64, 128, 256, 512, 1024)
+
+
+def _parse_variant(request) -> tuple[int | None, str]:
+    """Return the width and format requested through the query string."""
+    width = request.query.get("width")
+    image_format = request.query.get("format", DEFAULT_IMAGE_FORMAT).lower()
+    if image_format == "jpg":
+        image_format = "jpeg"
+    if image_format not in IMAGE_FORMATS:
+        raise web.HTTPBadRequest(text=f"Unsupported format {image_format}")
+    if width is not None:
+        try:
+            width = int(width)
+        except ValueError as err:
+            raise web.HTTPBadRequest(text="width must be an integer") from err
+        width = next((size for size in IMAGE_WIDTHS if size >= width), None)
+    return width, image_format
+
+
+def image_url(kind: str, image_id) -> str:
+    """Return the immutable URL of a brand or variety image."""
+    return IMAGE_URL.format(kind=kind, image_id=quote(str(image_id), safe=""))
+
+
+def _placeholder_size(size: tuple[int, int], width: int | None) -> tuple[int, int]:
+    if width is None or width >= size[0]:
+        return size
+    return width, max(1, round(size[1] * width / size[0]))
+
+
+class KeurigView(HomeAssistantView):
+    def __init__(self, hass, image_cache: KeurigImageCache):
+        """Initialize."""
+        self.requires_auth = False
+        self.hass = hass
+        self._image_cache = image_cache
+
+    async def _get_device_by_entity_id(self, entity_id):
+        """Return the coordinator and brewer owning entity_id."""
+        if (coordinator := get_coordinator_for_entity(self.hass, entity_id)) is None:
+            return None, None
+        await coordinator.get_devices()
+        return coordinator, coordinator.get_device_by_entity_id(entity_id)
+
+    async def _async_get_image(
+        self, coordinator, kind, image_id, fetch, width, image_format
+    ) -> CachedImage | web.Response:
+        """Return the image from the cache, or an error response if the cloud
+        couldn't provide it within the entry's deadline."""
+        fetch = partial(
+            coordinator.session.async_call,
+            fetch,
+            timeout=coordinator.entry.options.get(
+                CONF_IMAGE_TIMEOUT, DEFAULT_IMAGE_TIMEOUT
+            ),
+        )
+        try:
+            return await self._image_cache.async_get(
+                kind, image_id, fetch, width, image_format
+            )
+        except HTTPStatusError as err:
+            return web.Response(status=err.response.status_code)
+        except CircuitOpenError:
+            return web.Response(
+                status=503, headers={hdrs.RETRY_AFTER: str(BREAKER_RESET_TIMEOUT)}
+            )
+        except asyncio.TimeoutError:
+            return web.Response(status=504)
+
+    def _image_response(
+        self,
+        request,
+        image: CachedImage | web.Response,
+        cache_control: str = CACHE_CONTROL_ENTITY,
+    ):
+        if isinstance(image, web.Response):
+            return image
+        if image.body is None:
+            # Sent with sendfile, FileResponse handles the conditional request
+            return web.FileResponse(
+                image.path,
+                headers={
+                    hdrs.CACHE_CONTROL: cache_control,
+                    hdrs.CONTENT_TYPE: image.content_type,
+                },
+            )
+        headers = {hdrs.ETAG: image.etag, hdrs.CACHE_CONTROL: cache_control}
+        if image.etag in request.headers.get(hdrs.IF_NONE_MATCH, ""):
+            return web.Response(status=304, headers=headers)
+        return web.Response(
+            body=image.body, content_type=image.content_type, headers=headers
+        )
+
+
+class ApiBrandView(KeurigView):
+    def __init__(self, hass, image_cache):
+        """Initialize."""
+        self.url = "/api/keurig_brand_proxy/{entity_id}"
+        self.name = "api:keurig:brand"
+        super().__init__(hass, image_cache)
+
+    async def get(self, request, entity_id: str):  # pylint: disable=unused-argument
+        """Handle HACS Web requests."""
+
+        coordinator, device = await self._get_device_by_entity_id(entity_id)
+
+        if device is None:
+            return web.Response(status=404)
+
+        state = self.hass.states.get(entity_id)
+        if state is None or ATTR_POD_BRAND not in state.attributes:
+            return web.Response(status=400)
+
+        width, image_format = _parse_variant(request)
+
+        brand_id = device.pod_brand_id
+        if brand_id is None:
+            image = await self._image_cache.async_get_placeholder(
+                *_placeholder_size(BRAND_IMAGE_SIZE, width), image_format
+            )
+            return self._image_response(request, image)
+        image = await self._async_get_image(
+            coordinator,
+            "brand",
+            brand_id,
+            coordinator.api.async_get_brand_image,
+            width,
+            image_format,
+        )
+        return self._image_response(request, image)
+
+
+class ApiVarietyView(KeurigView):
+    def __init__(self, hass, image_cache):
+        """Initialize."""
+        self.url = "/api/keurig_variety_proxy/{entity_id}"
+        self.name = "api:keurig:variety"
+
+        super().__init__(hass, image_cache)
+
+    async def get(self, request, entity_id: str):  # pylint: disable=unused-argument
+        """Handle HACS Web requests."""
+
+        coordinator, device = await self._get_device_by_entity_id(entity_id)
+
+        if device is None:
+            return web.Response(status=404)
+
+        state = self.hass.states.get(entity_id)
+        if state is None or ATTR_POD_VARIETY not in state.attributes:
+            return web.Response(status=400)
+
+        width, image_format = _parse_variant(request)
+
+        variety_id = device.pod_variety_id
+        if variety_id is None:
+            image = await self._image_cache.async_get_placeholder(
+                *_placeholder_size(VARIETY_IMAGE_SIZE, width), image_format
+            )
+            return self._image_response(request, image)
+        image = await self._async_get_image(
+            coordinator,
+            "variety",
+            variety_id,
+            coordinator.api.async_get_variety_image,
+            width,
+            image_format,
+        )
+        return self._image_response(request, image)
+
+
+class ApiImageView(KeurigView):
+    """Pod artwork addressed by brand or variety id, cacheable forever."""
+
+    def __init__(self, hass, image_cache):
+        """Initialize."""
+        self.url = IMAGE_URL
+        self.name = "api:keurig:image"
+        super().__init__(hass, image_cache)
+
+    async def get(self, request, kind: str, image_id: str):
+        if kind not in IMAGE_KINDS:
+            return web.Response(status=404)
+        attribute, fetch_method = IMAGE_KINDS[kind]
+
+        width, image_format = _parse_variant(request)
+
+        # Only pods some brewer has reported are fetched from the cloud, so the
+        # unauthenticated endpoint can't be used to make arbitrary cloud calls
+        coordinator = next(
+            (
+                coordinator
+                for coordinator in self.hass.data.get(DOMAIN, {}).values()
+                for device in coordinator.devices
+                if str(getattr(device, attribute)) == image_id
+            ),
+            None,
+        )
+        if coordinator is not None:
+            image = await self._async_get_image(
+                coordinator,
+                kind,
+                image_id,
+                getattr(coordinator.api, fetch_method),
+                width,
+                image_format,
+            )
+        elif await self._image_cache.async_contains(kind, image_id):
+            image = await self._image_cache.async_get(
+                kind, image_id, _not_cached, width, image_format
+            )
+        else:
+            return web.Response(status=404)
+
+        return self._image_response(request, image, CACHE_CONTROL_IMMUTABLE)
+
+
+async def _not_cached(image_id: str) -> bytes:
+    raise web.HTTPNotFound()